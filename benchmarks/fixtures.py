@@ -0,0 +1,128 @@
+import random
+
+import numpy as np
+import pandas as pd
+
+from scrapers.neighborhoods import MANHATTAN_NEIGHBORHOODS, BROOKLYN_NEIGHBORHOODS
+
+STREETS = ["Broadway", "W 15th St", "E 86th St", "Bedford Ave", "Atlantic Ave", "5th Ave"]
+
+# Stand-ins for the markup around the results list (nav, scripts, map data),
+# so soup construction works on realistically sized pages
+PAGE_HEAD = """<!DOCTYPE html><html><head><title>Search results</title>
+<script>window.__config = {"tracking": true, "experiments": [1, 2, 3]};</script>
+<link rel="stylesheet" href="/static/site.css"></head><body>
+<header><nav>{nav}</nav></header><main>
+"""
+PAGE_TAIL = """</main><footer>{footer}</footer>
+<script>{script}</script></body></html>"""
+
+
+def page_chrome(rng):
+    nav = "".join(f'<a href="/link/{i}" class="nav-item">Link {i}</a>' for i in range(60))
+    footer = "".join(f"<p class='legal'>Footer paragraph {i}</p>" for i in range(40))
+    script = "var mapTiles = [" + ",".join(str(rng.random()) for _ in range(2000)) + "];"
+    return PAGE_HEAD.replace("{nav}", nav), PAGE_TAIL.replace(
+        "{footer}", footer
+    ).replace("{script}", script)
+
+
+def random_listing(rng):
+    beds = rng.choice([0, 1, 1, 2, 2, 3, 4])
+    return {
+        "price": rng.randrange(1800, 9000, 25),
+        "address": f"{rng.randrange(1, 999)} {rng.choice(STREETS)} #{rng.randrange(1, 30)}{rng.choice('ABCD')}",
+        "beds": beds,
+        "baths": rng.choice([1, 1, 1.5, 2]),
+        "sqft": rng.choice([None, rng.randrange(350, 2000, 10)]),
+    }
+
+
+def zillow_card(listing):
+    details = []
+    if listing["beds"] == 0:
+        details.append("<li>Studio</li>")
+    else:
+        details.append(f"<li><b>{listing['beds']}</b> bds</li>")
+    details.append(f"<li><b>{listing['baths']:g}</b> ba</li>")
+    if listing["sqft"]:
+        details.append(f"<li><b>{listing['sqft']:,}</b> sqft</li>")
+    return (
+        '<li class="ListItem"><article class="property-card">'
+        '<div class="StyledPropertyCardDataWrapper property-card-data">'
+        f'<a class="property-card-link" href="/homedetails/{listing["price"]}">'
+        f'<address data-test="property-card-addr">{listing["address"]}, New York, NY</address></a>'
+        f'<span data-test="property-card-price">${listing["price"]:,}/mo</span>'
+        '<ul class="StyledPropertyCardHomeDetailsList-c11n-8-109-3__sc-1j0som5-0">'
+        f"{''.join(details)}</ul></div></article></li>"
+    )
+
+
+def streeteasy_card(listing):
+    beds = "Studio" if listing["beds"] == 0 else f"{listing['beds']} beds"
+    sqft = f" {listing['sqft']:,} ft²" if listing["sqft"] else ""
+    return (
+        '<div class="searchCardList--listItem"><div class="listingCard">'
+        f'<address class="listingCard-addressLabel">{listing["address"]}</address>'
+        f'<span class="price">${listing["price"]:,}</span>'
+        f'<div class="listingCard-keyDetails">{beds} {listing["baths"]:g} bath{sqft}</div>'
+        "</div></div>"
+    )
+
+
+def apartments_card(listing):
+    beds = "Studio" if listing["beds"] == 0 else f"{listing['beds']} Beds"
+    sqft = f'<div class="sqft-range">{listing["sqft"]:,} sq ft</div>' if listing["sqft"] else ""
+    return (
+        '<article class="placard placard-option-diamond has-header">'
+        f'<div class="property-address js-url">{listing["address"]}, New York, NY</div>'
+        f'<div class="price-range">${listing["price"]:,}</div>'
+        f'<div class="bed-range">{beds}</div>'
+        f'<div class="bath-range">{listing["baths"]:g} Bath</div>'
+        f"{sqft}</article>"
+    )
+
+
+CARD_BUILDERS = {
+    "zillow": (zillow_card, '<ul class="photo-cards">', "</ul>"),
+    "streeteasy": (streeteasy_card, '<div class="SearchResultsListingsContainer">', "</div>"),
+    "apartments.com": (apartments_card, '<div class="placardContainer">', "</div>"),
+}
+
+
+def results_page(source, cards, seed=0):
+    """Synthetic results page for a source holding the given number of cards"""
+    rng = random.Random(f"{source}-{cards}-{seed}")
+    build_card, open_list, close_list = CARD_BUILDERS[source]
+    head, tail = page_chrome(rng)
+    body = "".join(build_card(random_listing(rng)) for _ in range(cards))
+    return f"{head}{open_list}{body}{close_list}{tail}"
+
+
+def listings_frame(rows, seed=0):
+    """Synthetic display-string frame in the shape of nyc_rent_prices_*.csv"""
+    rng = np.random.default_rng(seed)
+    neighborhoods = np.array(MANHATTAN_NEIGHBORHOODS + BROOKLYN_NEIGHBORHOODS, dtype=object)
+
+    prices = rng.integers(72, 360, rows) * 25
+    price_text = pd.Series(prices).map("${:,}".format).to_numpy(dtype=object)
+
+    sqft = rng.integers(35, 200, rows) * 10
+    sqft_text = pd.Series(sqft).map("{:,} sqft".format).to_numpy(dtype=object)
+    sqft_text[rng.random(rows) < 0.3] = "N/A"
+
+    beds = np.array(["Studio", "1 bed", "2 bed", "3 bed", "4 bed"], dtype=object)
+    baths = np.array(["1 ba", "1.5 ba", "2 ba", "N/A"], dtype=object)
+
+    return pd.DataFrame(
+        {
+            "source": rng.choice(np.array(["zillow", "streeteasy", "apartments.com"]), rows),
+            "neighborhood": rng.choice(neighborhoods, rows),
+            "price": price_text,
+            "address": "N/A",
+            "beds": rng.choice(beds, rows, p=[0.15, 0.35, 0.3, 0.15, 0.05]),
+            "baths": rng.choice(baths, rows),
+            "sqft": sqft_text,
+            "property_type": "rent",
+        }
+    )
@@ -0,0 +1,165 @@
+"""Offline benchmarks for listing extraction and neighborhood stats
+
+    python -m benchmarks.run                              # time everything, save JSON
+    python -m benchmarks.run --baseline base.json         # fail on >15% slowdowns
+    python -m benchmarks.run --stats-rows 10000 10000000  # include the 10M-row frame
+
+Nothing here starts a browser or touches the network: pages come from the
+synthetic fixtures, or from an existing PageCache with --page-cache.
+"""
+
+import io
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import contextlib
+
+import pandas as pd
+import soupsieve as sv
+
+from benchmarks.fixtures import listings_frame, results_page
+from scrapers.apartments_scraper import ApartmentsScraper
+from scrapers.page_cache import PageCache
+from scrapers.stats import calculate_neighborhood_stats
+from scrapers.streeteasy_scraper import StreetEasyScraper
+from scrapers.zillow_scraper import ZillowScraper
+
+SCRAPERS = {
+    "zillow": ZillowScraper,
+    "streeteasy": StreetEasyScraper,
+    "apartments.com": ApartmentsScraper,
+}
+
+DEFAULT_CARD_COUNTS = [20, 200, 2000]
+DEFAULT_STATS_ROWS = [10_000, 100_000, 1_000_000]
+
+
+def measure(func, repeat):
+    """Run func repeat times and return timing stats in seconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        # The scrapers print per card; keep that out of the terminal
+        with contextlib.redirect_stdout(io.StringIO()):
+            func()
+        timings.append(time.perf_counter() - start)
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "repeat": repeat,
+    }
+
+
+def bench_page(scraper, html, repeat):
+    """Time each extraction phase of one page's HTML"""
+    card_selector = sv.compile(scraper.card_selector)
+    soup = scraper.make_soup(html)
+    cards = card_selector.select(soup)
+
+    def extract():
+        scraper.build_properties([scraper.read_card(card) for card in cards])
+
+    return {
+        "soup": measure(lambda: scraper.make_soup(html), repeat),
+        "select": measure(lambda: card_selector.select(soup), repeat),
+        "extract": measure(extract, repeat),
+        "total": measure(lambda: scraper.extract_properties_from_html(html), repeat),
+    }, {"bytes": len(html.encode("utf-8")), "cards": len(cards)}
+
+
+def bench_parsing(card_counts, repeat, page_cache=None):
+    results = {}
+    for source, scraper_class in SCRAPERS.items():
+        scraper = scraper_class(offline=True)
+
+        pages = [(str(cards), results_page(source, cards)) for cards in card_counts]
+        if page_cache is not None:
+            # Recorded pages are keyed by their position in the cache index
+            for i, entry in enumerate(page_cache.entries(source)):
+                pages.append((f"cached-{i}", page_cache.load(entry)))
+
+        for label, html in pages:
+            phases, info = bench_page(scraper, html, repeat)
+            for phase, timing in phases.items():
+                results[f"parse/{source}/{label}/{phase}"] = dict(timing, **info)
+            print(
+                f"{source:<15} {label:>10} cards={info['cards']:<5} "
+                f"total={phases['total']['median'] * 1000:9.2f} ms"
+            )
+    return results
+
+
+def bench_stats(row_counts, repeat):
+    results = {}
+    for rows in row_counts:
+        df = listings_frame(rows)
+        # Each run gets a fresh copy, since the stats add columns in place
+        timing = measure(lambda: calculate_neighborhood_stats(df.copy()), repeat)
+        results[f"stats/{rows}"] = dict(timing, rows=rows)
+        print(f"stats {rows:>10} rows  median={timing['median'] * 1000:9.2f} ms")
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Return (name, ratio) for every benchmark slower than baseline by more than threshold"""
+    regressions = []
+    for name, timing in sorted(results.items()):
+        base = baseline.get(name)
+        if base is None or not base["median"]:
+            continue
+        ratio = timing["median"] / base["median"]
+        flag = ""
+        if ratio > 1 + threshold:
+            regressions.append((name, ratio))
+            flag = "  REGRESSION"
+        print(f"{name:<45} {ratio:6.2f}x{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cards", type=int, nargs="*", default=DEFAULT_CARD_COUNTS)
+    parser.add_argument("--stats-rows", type=int, nargs="*", default=DEFAULT_STATS_ROWS)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--page-cache", help="also time the pages in this PageCache directory")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="earlier results JSON to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.15,
+        help="allowed slowdown of a median before it counts as a regression (0.15 = 15%%)",
+    )
+    args = parser.parse_args(argv)
+
+    page_cache = PageCache(args.page_cache) if args.page_cache else None
+    results = {}
+    results.update(bench_parsing(args.cards, args.repeat, page_cache))
+    results.update(bench_stats(args.stats_rows, args.repeat))
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pandas": pd.__version__,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved results to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} benchmarks regressed by more than {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
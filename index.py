@@ -9,32 +9,37 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.keys import Keys
-from webdriver_manager.chrome import ChromeDriverManager
-
-MANHATTAN_NEIGHBORHOODS = [
-    "upper-east-side",
-    "upper-west-side",
-    "midtown",
-    "chelsea",
-    "greenwich-village",
-    "east-village",
-    "harlem",
-    "tribeca",
-    "soho",
-]
-
-BROOKLYN_NEIGHBORHOODS = [
-    "williamsburg",
-    "park-slope",
-    "brooklyn-heights",
-    "dumbo",
-    "bushwick",
-    "bedford-stuyvesant",
-]
+from selenium.common.exceptions import TimeoutException
+
+from scrapers.driver_pool import resolve_chromedriver
+from scrapers.journal import RunJournal
+from scrapers.memory import MemoryGovernor
+from scrapers.rate_limit import default_rate_limiter
+from scrapers.scrolling import adaptive_scroll
+from scrapers.stats import calculate_neighborhood_stats
+from scrapers.neighborhoods import MANHATTAN_NEIGHBORHOODS, BROOKLYN_NEIGHBORHOODS
 
 
 class ZillowScraper:
-    def __init__(self, headless=True):
+    def __init__(self, headless=True, scroll_mode="adaptive", page_load_timeout=30):
+        self.headless = headless
+        self.page_load_timeout = page_load_timeout
+        self.driver = self.start_driver()
+        # Pages loaded by the current browser, checked by the memory governor
+        self.pages_loaded = 0
+        self.current_source = "zillow"
+        self.current_neighborhood = None
+        self.current_property_type = None
+
+        # Base URL for Zillow NYC searches
+        self.base_url = "https://www.zillow.com/new-york-ny"
+
+        # "adaptive" waits for cards to render, "fixed" uses the old sleeps
+        self.scroll_mode = scroll_mode
+
+    def start_driver(self):
+        """Launch and disguise a Chrome instance"""
+        headless = self.headless
         # Setup Chrome options
         chrome_options = Options()
         if headless:
@@ -50,15 +55,15 @@ class ZillowScraper:
         chrome_options.add_experimental_option("useAutomationExtension", False)
 
         # Initialize webdriver
-        self.driver = webdriver.Chrome(
-            service=Service(ChromeDriverManager().install()), options=chrome_options
+        driver = webdriver.Chrome(
+            service=Service(resolve_chromedriver()), options=chrome_options
         )
-        self.driver.execute_script(
+        driver.execute_script(
             "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
         )
 
         # Execute CDP commands to modify navigator properties
-        self.driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
             "source": """
             Object.defineProperty(navigator, 'webdriver', {
                 get: () => undefined
@@ -72,8 +77,19 @@ class ZillowScraper:
             """
         })
 
-        # Base URL for Zillow NYC searches
-        self.base_url = "https://www.zillow.com/new-york-ny"
+        # Fail a stuck navigation instead of waiting on it forever
+        driver.set_page_load_timeout(self.page_load_timeout)
+        driver.set_script_timeout(self.page_load_timeout)
+        return driver
+
+    def restart_driver(self):
+        """Swap the browser for a fresh one, keeping the current context"""
+        try:
+            self.driver.quit()
+        except Exception as e:
+            print(f"Error closing browser: {e}")
+        self.driver = self.start_driver()
+        self.pages_loaded = 0
 
     def get_neighborhood_url(self, neighborhood_name):
         """Get URL for a specific NYC neighborhood based on the base URL"""
@@ -87,6 +103,15 @@ class ZillowScraper:
 
     def scroll_page(self, scroll_pauses=5, scroll_increment=800):
         """Scroll down the page to load all properties"""
+        if self.scroll_mode == "adaptive":
+            adaptive_scroll(
+                self.driver,
+                "div.property-card-data",
+                page_size=41,
+                scroll_increment=scroll_increment,
+            )
+            return
+
         # Get scroll height
         last_height = self.driver.execute_script("return document.body.scrollHeight")
 
@@ -297,9 +322,16 @@ class ZillowScraper:
         else:
             search_url = f"{url}/houses/"
 
-        self.driver.get(search_url)
-        # time.sleep(random.uniform(3, 5))  # Random delay to avoid detection
-        time.sleep(50)  # Random delay to avoid detection
+        # Space out requests with the shared per-domain budget rather than a
+        # fixed sleep after every load
+        default_rate_limiter.acquire(search_url)
+        try:
+            self.driver.get(search_url)
+        except TimeoutException:
+            print(f"Page load timed out for {search_url}, restarting browser")
+            self.restart_driver()
+            return []
+        self.pages_loaded += 1
 
         # Check if access has been denied
         page_title = self.driver.title
@@ -307,10 +339,10 @@ class ZillowScraper:
             print(f"Access denied error when loading {search_url}")
             return []
 
-        # Wait for the page to load
+        # Wait for the results list to render
         try:
             selector = "div.search-page-lst-container"
-            WebDriverWait(self.driver, 5).until(
+            WebDriverWait(self.driver, 20).until(
                 EC.presence_of_element_located((By.CSS_SELECTOR, selector))
             )
         except:
@@ -333,7 +365,9 @@ class ZillowScraper:
         detailed_neighborhoods.extend(BROOKLYN_NEIGHBORHOODS)
         return detailed_neighborhoods
 
-    def run_scraper(self, property_type="rent", use_detailed=True):
+    def run_scraper(
+        self, property_type="rent", use_detailed=True, journal=None, memory_governor=None
+    ):
         """Run the scraper for all neighborhoods"""
         all_properties = []
 
@@ -341,10 +375,25 @@ class ZillowScraper:
 
         # Scrape each neighborhood
         for name in neighborhoods:
+            # Reuse neighborhoods a previous, interrupted run already finished
+            if journal is not None and journal.is_complete("zillow", name, property_type):
+                all_properties.extend(journal.records("zillow", name, property_type))
+                continue
+
             try:
+                # Restart a browser that has grown too big before the next page
+                if memory_governor is not None:
+                    memory_governor.check(self)
+
                 properties = self.scrape_neighborhood(name, property_type)
                 all_properties.extend(properties)
 
+                # An empty result is usually a timeout or a block page, so it
+                # stays out of the journal and a resumed run tries it again
+                if journal is not None and properties:
+                    journal.record_page("zillow", name, property_type, 1, properties)
+                    journal.mark_complete("zillow", name, property_type)
+
                 # Random delay between neighborhood scrapes
                 time.sleep(random.uniform(5, 10))
             except Exception as e:
@@ -361,48 +410,7 @@ class ZillowScraper:
 
     def calculate_neighborhood_stats(self, df):
         """Calculate average prices and other stats by neighborhood"""
-        # Clean price data - remove $ and convert to float
-        df["price_clean"] = (
-            df["price"]
-            .str.replace("$", "")
-            .str.replace(",", "")
-            .str.replace("/mo", "")
-            .str.replace("+", "")
-        )
-        df["price_clean"] = pd.to_numeric(df["price_clean"], errors="coerce")
-
-        # Clean sqft data
-        df["sqft_clean"] = (
-            df["sqft"].str.replace("sqft", "").str.replace(",", "").str.strip()
-        )
-        df["sqft_clean"] = pd.to_numeric(df["sqft_clean"], errors="coerce")
-
-        # Calculate price per sqft where available
-        df["price_per_sqft"] = df.apply(
-            lambda x: x["price_clean"] / x["sqft_clean"]
-            if pd.notnull(x["sqft_clean"]) and x["sqft_clean"] > 0
-            else None,
-            axis=1,
-        )
-
-        # Group by neighborhood and calculate stats
-        neighborhood_stats = df.groupby("neighborhood").agg(
-            {
-                "price_clean": ["mean", "median", "min", "max", "count"],
-                "price_per_sqft": ["mean", "median", "min", "max", "count"],
-                "beds": lambda x: x.value_counts().index[0]
-                if len(x.value_counts()) > 0
-                else None,
-                "baths": lambda x: x.value_counts().index[0]
-                if len(x.value_counts()) > 0
-                else None,
-            }
-        )
-
-        # Flatten the column hierarchy
-        neighborhood_stats.columns = [
-            "_".join(col).strip() for col in neighborhood_stats.columns.values
-        ]
+        neighborhood_stats = calculate_neighborhood_stats(df)
 
         # Save to CSV
         filename = f"nyc_neighborhood_stats_{time.strftime('%Y%m%d')}.csv"
@@ -422,7 +430,12 @@ if __name__ == "__main__":
 
     try:
         # Scrape rental properties
-        rental_data = scraper.run_scraper(property_type="rent", use_detailed=True)
+        rental_data = scraper.run_scraper(
+            property_type="rent",
+            use_detailed=True,
+            journal=RunJournal.for_run("rent", prefix="index"),
+            memory_governor=MemoryGovernor(),
+        )
 
         # Calculate neighborhood statistics
         rental_stats = scraper.calculate_neighborhood_stats(rental_data)
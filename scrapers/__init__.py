@@ -1,4 +1,21 @@
 from scrapers.base_scraper import BaseScraper
+from scrapers.driver_pool import DriverPool
+from scrapers.history import ListingHistory
+from scrapers.journal import RunJournal
+from scrapers.memory import MemoryGovernor
+from scrapers.listing import Listing, listings_to_frame
+from scrapers.page_cache import PageCache
+from scrapers.rate_limit import RateLimiter
+from scrapers.storage import ListingDataset
+from scrapers.timing import PhaseTimer
+from scrapers.watchdog import Watchdog
+from scrapers.sinks import CsvSink, ParquetSink, DatasetSink, HistorySink, StatsSink
+from scrapers.stats import NeighborhoodStats
+from scrapers.dedup import DedupIndex, DedupSink, dedupe_listings
+from scrapers.diff import ListingDiff, DiffSink
+from scrapers.cube import PriceCube
+from scrapers.service import StatsService
 from scrapers.zillow_scraper import ZillowScraper
 from scrapers.streeteasy_scraper import StreetEasyScraper
 from scrapers.apartments_scraper import ApartmentsScraper
+from scrapers.crawler import ParallelCrawler, replay_cache
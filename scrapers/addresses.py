@@ -0,0 +1,63 @@
+import re
+
+# Unit designators as they appear in listing addresses ("#4A", "Apt 4A", "Unit PH2")
+UNIT_PATTERN = re.compile(
+    r"(?:#\s*|\b(?:apt|apartment|unit|suite|ste|rm|room)\b\.?\s*#?\s*)([a-z0-9-]+)"
+)
+ORDINAL_PATTERN = re.compile(r"\b(\d+)(?:st|nd|rd|th)\b")
+PUNCTUATION_PATTERN = re.compile(r"[^\w\s-]")
+
+STREET_ABBREVIATIONS = {
+    "street": "st",
+    "avenue": "ave",
+    "av": "ave",
+    "place": "pl",
+    "road": "rd",
+    "boulevard": "blvd",
+    "drive": "dr",
+    "lane": "ln",
+    "parkway": "pkwy",
+    "terrace": "ter",
+    "square": "sq",
+    "court": "ct",
+    "east": "e",
+    "west": "w",
+    "north": "n",
+    "south": "s",
+}
+
+
+def split_address(address):
+    """Return the canonical street line and unit of an address
+
+    Only the part before the first comma is kept, since sources disagree on
+    how they write the city, state and zip. "22 West 15th Street #4A, New York"
+    and "22 W 15th St Apt 4A" both give ("22 w 15 st", "4a").
+    """
+    if not address or address == "N/A":
+        return "", ""
+
+    # The unit is sometimes set off by its own comma ("22 W 15th St, Apt 4A"),
+    # so take it out before cutting the address down to the street line
+    street = address.lower()
+    unit = ""
+    match = UNIT_PATTERN.search(street)
+    if match:
+        unit = match.group(1).strip("-")
+        street = street[: match.start()] + street[match.end() :]
+    street = street.split(",")[0]
+
+    street = PUNCTUATION_PATTERN.sub(" ", street)
+    street = ORDINAL_PATTERN.sub(r"\1", street)
+    words = [STREET_ABBREVIATIONS.get(word, word) for word in street.split()]
+    return " ".join(words), unit
+
+
+def listing_key(source, property_type, address):
+    """Stable key for one unit on one source: source|property_type|street|unit
+
+    The same apartment can be listed for rent and for sale at once, and
+    those are separate listings with separate price histories.
+    """
+    street, unit = split_address(address)
+    return f"{source}|{property_type or ''}|{street}|{unit}"
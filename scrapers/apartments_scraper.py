@@ -1,23 +1,48 @@
-import time
-import random
-from bs4 import BeautifulSoup
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
-from scrapers.base_scraper import BaseScraper
+from scrapers.base_scraper import BaseScraper, class_strainer, compile_selectors
+from scrapers.listing import Listing
+
+
+# Reads the same fields as ApartmentsScraper.read_card in a single script call
+EXTRACT_SCRIPT = """
+const text = (root, selector) => {
+    const el = root.querySelector(selector);
+    return el ? el.textContent.trim() : null;
+};
+return Array.from(document.querySelectorAll("article.placard")).map(card => ({
+    price: text(card, "div.price-range"),
+    address: text(card, "div.property-address"),
+    beds: text(card, "div.bed-range"),
+    baths: text(card, "div.bath-range"),
+    sqft: text(card, "div.sqft-range"),
+}));
+"""
 
 
 class ApartmentsScraper(BaseScraper):
-    def __init__(self, headless=True):
-        super().__init__(headless)
+    card_selector = "article.placard"
+    page_size = 40
+    extract_script = EXTRACT_SCRIPT
+    card_strainer = class_strainer("article", "placard")
+
+    # Compiled once at class load and reused for every card
+    (property_selector,) = compile_selectors("article.placard")
+    price_selectors = compile_selectors("div.price-range")
+    address_selectors = compile_selectors("div.property-address")
+    beds_selectors = compile_selectors("div.bed-range")
+    baths_selectors = compile_selectors("div.bath-range")
+    sqft_selectors = compile_selectors("div.sqft-range")
+
+    def __init__(self, headless=True, **kwargs):
+        super().__init__(headless, **kwargs)
         self.current_source = "apartments.com"
 
-    def scrape_neighborhood(self, neighborhood_name, property_type="rent", max_pages=3):
-        """Scrape Apartments.com listings for a specific neighborhood"""
+    def open_search(self, neighborhood_name, property_type):
+        """Load the first results page to scrape, returning (search_url, page) or None"""
         print(f"Scraping Apartments.com - {neighborhood_name}...")
-        self.current_neighborhood = neighborhood_name
-        self.current_property_type = property_type
 
         # Apartments.com has different URL structure
         neighborhood_formatted = neighborhood_name.replace("-", "-").lower()
@@ -25,71 +50,68 @@ class ApartmentsScraper(BaseScraper):
         # Apartments.com only has rentals
         search_url = f"https://www.apartments.com/new-york/{neighborhood_formatted}/"
 
-        self.driver.get(search_url)
-        time.sleep(random.uniform(3, 5))
+        # Pick up after the last page a previous, interrupted run recorded
+        first_page = self.resume_page()
+        self.load_page(self.get_page_url(search_url, first_page))
 
         # Wait for page to load
-        try:
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located(
-                    (By.CSS_SELECTOR, "div.placardContainer")
+        with self.timed("wait"):
+            try:
+                WebDriverWait(self.driver, 10).until(
+                    EC.presence_of_element_located(
+                        (By.CSS_SELECTOR, "div.placardContainer")
+                    )
                 )
-            )
-        except:
-            print(f"Timeout or error loading {search_url}")
-            return []
+            except:
+                print(f"Timeout or error loading {search_url}")
+                return None
 
-        self.scroll_page(scroll_pauses=8)  # More scrolling for apartments.com
+        return search_url, first_page
 
-        # Extract properties (pagination works differently on apartments.com)
-        soup = BeautifulSoup(self.driver.page_source, "html.parser")
-        properties = self.extract_properties(soup)
+    def scroll_page(self, scroll_pauses=8, scroll_increment=800):
+        """Scroll down the page to load all properties"""
+        # More scrolling for apartments.com
+        super().scroll_page(scroll_pauses, scroll_increment)
 
-        print(f"Apartments.com: Extracted {len(properties)} properties")
-
-        return properties
+    def get_page_url(self, search_url, page):
+        """Build the URL of results page N of a search"""
+        if page == 1:
+            return search_url
+        return f"{search_url.rstrip('/')}/{page}/"
 
     def extract_properties(self, soup):
         """Extract property data from Apartments.com's HTML"""
-        property_cards = soup.select("article.placard")
+        property_cards = self.property_selector.select(soup)
 
-        properties = []
+        raw_cards = []
         for card in property_cards:
             try:
-                # Price
-                price_elem = card.select_one("div.price-range")
-                price = price_elem.text.strip() if price_elem else "N/A"
-
-                # Address
-                address_elem = card.select_one("div.property-address")
-                address = address_elem.text.strip() if address_elem else "N/A"
-
-                # Beds
-                beds_elem = card.select_one("div.bed-range")
-                beds = beds_elem.text.strip() if beds_elem else "N/A"
-
-                # Baths
-                baths_elem = card.select_one("div.bath-range")
-                baths = baths_elem.text.strip() if baths_elem else "N/A"
-
-                # Square footage
-                sqft_elem = card.select_one("div.sqft-range")
-                sqft = sqft_elem.text.strip() if sqft_elem else "N/A"
-
-                properties.append(
-                    {
-                        "source": "apartments.com",
-                        "neighborhood": self.current_neighborhood,
-                        "price": price,
-                        "address": address,
-                        "beds": beds,
-                        "baths": baths,
-                        "sqft": sqft,
-                        "property_type": self.current_property_type,
-                    }
-                )
+                raw_cards.append(self.read_card(card))
             except Exception as e:
                 print(f"Error extracting Apartments.com data from card: {e}")
                 continue
 
-        return properties
+        return self.build_properties(raw_cards)
+
+    def read_card(self, card):
+        """Read the raw text fields of one Apartments.com card (mirrors extract_script)"""
+        return {
+            "price": self.try_selectors(card, self.price_selectors),
+            "address": self.try_selectors(card, self.address_selectors),
+            "beds": self.try_selectors(card, self.beds_selectors),
+            "baths": self.try_selectors(card, self.baths_selectors),
+            "sqft": self.try_selectors(card, self.sqft_selectors),
+        }
+
+    def build_property(self, raw):
+        """Turn one raw Apartments.com card into a Listing"""
+        return Listing.from_display(
+            "apartments.com",
+            self.current_neighborhood,
+            self.current_property_type,
+            price=raw["price"],
+            address=raw["address"],
+            beds=raw["beds"],
+            baths=raw["baths"],
+            sqft=raw["sqft"],
+        )
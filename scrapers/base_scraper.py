@@ -1,49 +1,175 @@
+import re
 import time
 import random
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
+import contextlib
+import soupsieve as sv
+from bs4 import BeautifulSoup, SoupStrainer
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+
+from scrapers.driver_pool import LEAN_RESOURCES, launch_driver, set_resource_blocking
+from scrapers.listing import Listing
+from scrapers.rate_limit import default_rate_limiter
+from scrapers.scrolling import adaptive_scroll
+from scrapers.watchdog import RETRYABLE_ERRORS
+
+# Prefer the C-backed lxml parser when it is installed
+try:
+    import lxml  # noqa: F401
+
+    DEFAULT_PARSER = "lxml"
+except ImportError:
+    DEFAULT_PARSER = "html.parser"
+
+
+def compile_selectors(*selectors):
+    """Compile CSS selectors once so per-card lookups don't re-parse them"""
+    return [sv.compile(selector) for selector in selectors]
+
+
+def class_strainer(tag_name, css_class):
+    """Build a SoupStrainer keeping only tags with css_class (and their children)"""
+    # Match the class as one word of the attribute, since cards carry several
+    pattern = re.compile(rf"(^|\s){re.escape(css_class)}(\s|$)")
+    return SoupStrainer(tag_name, class_=pattern)
 
 
 class BaseScraper:
-    def __init__(self, headless=True):
-        # Setup Chrome options
-        chrome_options = Options()
+    # CSS selector matching one rendered listing card, and how many cards a
+    # full results page holds; used by the adaptive scroll mode
+    card_selector = None
+    page_size = None
+    # Script returning the raw card fields read_card would produce, so a page
+    # can be extracted without transferring and parsing its whole HTML
+    extract_script = None
+    # Restricts HTML parsing to the listing cards; None parses the whole page
+    card_strainer = None
+    # How many results pages are loaded side by side in separate tabs
+    max_open_tabs = 4
+    # Resource kinds (see driver_pool.BLOCKED_RESOURCES) skipped in lean mode
+    blocked_resources = LEAN_RESOURCES
+    # Seconds to wait for a browser from a full driver pool before giving up
+    lease_timeout = 600
 
-        if headless:
-            chrome_options.add_argument("--headless")
+    def __init__(
+        self,
+        headless=True,
+        driver_pool=None,
+        scroll_mode="adaptive",
+        extraction_engine="soup",
+        parser_backend=DEFAULT_PARSER,
+        rate_limiter=None,
+        journal=None,
+        page_cache=None,
+        offline=False,
+        timer=None,
+        lean=False,
+        memory_governor=None,
+        watchdog=None,
+    ):
+        # Lease a warm browser from the pool when one is given, otherwise
+        # launch a dedicated one. Offline scrapers only re-parse cached pages.
+        self.driver_pool = driver_pool
+        self.headless = headless
+        # Lean scrapers don't download images, fonts, map tiles or trackers
+        self.lean = lean
+        # Optional Watchdog enforcing timeouts and a deadline per neighborhood
+        self.watchdog = watchdog
+        self.driver = None if offline else self.start_driver()
 
-        # Add realistic user agent
-        chrome_options.add_argument(
-            "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36"
-        )
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option("useAutomationExtension", False)
-
-        # Initialize webdriver
-        self.driver = webdriver.Chrome(
-            service=Service(ChromeDriverManager().install()), options=chrome_options
-        )
+        # Pages loaded by this scraper, used by the pool to recycle browsers
+        self.pages_loaded = 0
+        # Optional MemoryGovernor restarting the browser between neighborhoods
+        self.memory_governor = memory_governor
 
-        self.driver.execute_script(
-            "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
-        )
+        # "adaptive" waits for cards to render, "fixed" uses the old sleeps
+        self.scroll_mode = scroll_mode
+        # "js" extracts cards in the browser, "soup" parses page_source
+        self.extraction_engine = extraction_engine
+        # BeautifulSoup tree builder used for page HTML
+        self.parser_backend = parser_backend
+
+        # Per-domain request budget every navigation has to go through
+        self.rate_limiter = rate_limiter or default_rate_limiter
+
+        # Optional RunJournal recording each finished page for resumable runs
+        self.journal = journal
+        # Optional PageCache keeping the HTML of every extracted page
+        self.page_cache = page_cache
+        # Optional PhaseTimer recording how long each phase of each page takes
+        self.timer = timer
 
         # Set current neighborhood and property type for context
         self.current_neighborhood = None
         self.current_property_type = None
         self.current_source = None
+        self.current_page = None
+        # Last page of the current unit handed out, so a retry carries on after it
+        self.last_page_done = 0
+
+    def start_driver(self):
+        """Lease or launch a browser set up for this scraper"""
+        if self.driver_pool is not None:
+            driver = self.driver_pool.acquire(timeout=self.lease_timeout)
+        else:
+            driver = launch_driver(self.headless, "eager" if self.lean else "normal")
+
+        # Pooled browsers are always set, as the previous lease may differ
+        if self.lean or self.driver_pool is not None:
+            set_resource_blocking(driver, self.blocked_resources if self.lean else ())
+        if self.watchdog is not None:
+            self.watchdog.configure(driver)
+        return driver
+
+    def restart_driver(self):
+        """Replace the browser with a fresh one; the scraping context is kept"""
+        if self.driver_pool is not None:
+            self.driver_pool.recycle(self.driver)
+        else:
+            try:
+                self.driver.quit()
+            except Exception as e:
+                print(f"Error closing browser: {e}")
+        self.driver = None
+        self.pages_loaded = 0
+        self.driver = self.start_driver()
+
+    def timed(self, phase):
+        """Time a phase of the current page with the scraper's PhaseTimer, if any
+
+        The context value is the timing record, which callers can give "bytes"
+        or "cards" counts.
+        """
+        if self.timer is None:
+            return contextlib.nullcontext({})
+        return self.timer.phase(
+            phase,
+            self.current_source,
+            self.current_neighborhood,
+            self.current_page,
+        )
+
+    def load_page(self, url):
+        """Navigate the browser to a URL once the domain's rate limit allows it"""
+        self.rate_limiter.acquire(url)
+        with self.timed("get"):
+            self.driver.get(url)
+        self.pages_loaded += 1
 
     def scroll_page(self, scroll_pauses=5, scroll_increment=800):
         """Scroll down the page to load all properties"""
+        if self.scroll_mode == "adaptive" and self.card_selector:
+            count = adaptive_scroll(
+                self.driver,
+                self.card_selector,
+                page_size=self.page_size,
+                scroll_increment=scroll_increment,
+            )
+            print(f"{self.current_source} - {count} cards loaded after scrolling")
+            return
+
         last_height = self.driver.execute_script("return document.body.scrollHeight")
 
         for i in range(scroll_pauses):
@@ -60,11 +186,313 @@ class BaseScraper:
             last_height = new_height
             time.sleep(random.uniform(0.5, 1.5))
 
+    def needs_scroll(self):
+        """Whether cards must be scrolled into view before extraction"""
+        return True
+
+    def get_page_url(self, search_url, page):
+        """Build the URL of results page N of a search"""
+        raise NotImplementedError
+
+    def wait_for_cards(self, timeout=10):
+        """Wait until at least one listing card is present, returning False on timeout"""
+        with self.timed("wait"):
+            try:
+                WebDriverWait(self.driver, timeout).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, self.card_selector))
+                )
+                return True
+            except TimeoutException:
+                return False
+
+    def open_search(self, neighborhood_name, property_type):
+        """Load the first results page to scrape, returning (search_url, page) or None"""
+        raise NotImplementedError
+
+    def scrape_neighborhood(self, neighborhood_name, property_type="rent", max_pages=3):
+        """Scrape every listing of a neighborhood into one list"""
+        properties = []
+        for batch in self.stream_neighborhood(neighborhood_name, property_type, max_pages):
+            properties.extend(batch)
+        return properties
+
+    def stream_neighborhood(self, neighborhood_name, property_type="rent", max_pages=3):
+        """Yield a neighborhood's listings one results page at a time
+
+        Pages a previous, interrupted run already journaled come first, so the
+        batches add up to the same listings scrape_neighborhood returns.
+        """
+        self.current_neighborhood = neighborhood_name
+        self.current_property_type = property_type
+
+        completed = self.completed_records()
+        if completed is not None:
+            yield completed
+            return
+
+        if self.journal is not None:
+            journaled = self.journaled_listings()
+            if journaled:
+                yield journaled
+
+        if self.memory_governor is not None:
+            self.memory_governor.check(self)
+
+        self.last_page_done = 0
+        if self.watchdog is None:
+            yield from self.unit_pages(neighborhood_name, property_type, max_pages)
+            return
+
+        for attempt in range(1, self.watchdog.retries + 2):
+            # Clear a deadline that fired after the previous unit finished
+            self.watchdog.expired(self)
+            error = None
+            try:
+                yield from self.watchdog.watch(
+                    self, self.unit_pages(neighborhood_name, property_type, max_pages)
+                )
+            except RETRYABLE_ERRORS as e:
+                error = e
+
+            if self.watchdog.expired(self):
+                reason = f"deadline of {self.watchdog.unit_deadline}s exceeded"
+            elif error is not None:
+                first_line = str(error).strip().split("\n")[0]
+                reason = f"{type(error).__name__}: {first_line}"
+            else:
+                return
+
+            # The browser is dead or wedged either way, so the unit goes on a new one
+            skip = attempt > self.watchdog.retries
+            self.watchdog.record(self, attempt, reason, "skipped" if skip else "retrying")
+            self.restart_driver()
+            if skip:
+                return
+
+    def unit_pages(self, neighborhood_name, property_type, max_pages):
+        """Open the search and yield its pages, from the first one not yet scraped"""
+        self.current_page = self.resume_page()
+        if self.current_page > max_pages:
+            # Every page is already scraped, e.g. a retry after the last page
+            if self.journal is not None:
+                self.journal.mark_complete(*self.current_unit())
+            return
+        search = self.open_search(neighborhood_name, property_type)
+        if search is None:
+            return
+        search_url, first_page = search
+        yield from self.iter_pages(search_url, max_pages, first_page)
+
+    def iter_pages(self, search_url, max_pages=3, first_page=1):
+        """Extract the loaded first page, then load later pages side by side in tabs
+
+        Yields each page's listings as soon as it is extracted.
+        """
+        source = self.current_source
+
+        self.current_page = first_page
+        if self.needs_scroll():
+            with self.timed("scroll"):
+                self.scroll_page()
+        properties = self.extract_current_page()
+        print(f"{source} - Page {first_page}: Extracted {len(properties)} properties")
+        self.record_page(first_page, properties)
+        if not properties:
+            # Past page 1 this is the end of the results. On page 1 it is more
+            # likely a timeout or a bot check than a neighborhood without
+            # listings, so the unit stays open for a resumed run to retry
+            if first_page > 1 and self.journal is not None:
+                self.journal.mark_complete(*self.current_unit())
+            return
+        self.last_page_done = first_page
+        yield properties
+
+        main_window = self.driver.current_window_handle
+        previous_addresses = {p.address for p in properties}
+        next_page = first_page + 1
+        # Stays False if a page fails to load, so a resumed run retries the unit
+        finished = next_page > max_pages
+
+        while not finished:
+            last_page = min(next_page + self.max_open_tabs, max_pages + 1)
+            tabs = []
+            try:
+                # Start every page in the batch loading before waiting on any of them
+                for page in range(next_page, last_page):
+                    page_url = self.get_page_url(search_url, page)
+                    self.rate_limiter.acquire(page_url)
+                    self.current_page = page
+                    with self.timed("get"):
+                        self.driver.switch_to.new_window("tab")
+                        # Blocking is per tab, so the new one needs it too
+                        if self.lean:
+                            set_resource_blocking(self.driver, self.blocked_resources)
+                        self.driver.execute_script(
+                            "window.location.href = arguments[0];", page_url
+                        )
+                    self.pages_loaded += 1
+                    tabs.append((page, self.driver.current_window_handle))
+
+                for page, handle in tabs:
+                    self.driver.switch_to.window(handle)
+                    self.current_page = page
+                    properties = []
+                    if self.wait_for_cards():
+                        if self.needs_scroll():
+                            with self.timed("scroll"):
+                                self.scroll_page()
+                        properties = self.extract_current_page()
+
+                    # Past the last page some sites repeat an earlier page
+                    addresses = {p.address for p in properties}
+                    if not properties or addresses == previous_addresses:
+                        print(f"{source} - Page {page}: no new listings, stopping")
+                        finished = True
+                        break
+
+                    print(f"{source} - Page {page}: Extracted {len(properties)} properties")
+                    self.record_page(page, properties)
+                    self.last_page_done = page
+                    yield properties
+                    previous_addresses = addresses
+                else:
+                    next_page = last_page
+                    finished = next_page > max_pages
+            except Exception as e:
+                # Under a watchdog a timeout or dead browser retries the unit
+                # from this page instead of ending it early
+                if self.watchdog is not None and isinstance(e, RETRYABLE_ERRORS):
+                    raise
+                print(f"Error loading more {source} pages: {e}")
+                break
+            finally:
+                for _, handle in tabs:
+                    try:
+                        self.driver.switch_to.window(handle)
+                        self.driver.close()
+                    except Exception:
+                        pass
+                self.driver.switch_to.window(main_window)
+
+        if finished and self.journal is not None:
+            self.journal.mark_complete(*self.current_unit())
+
+    def current_unit(self):
+        """The (source, neighborhood, property_type) being scraped"""
+        return (
+            self.current_source,
+            self.current_neighborhood,
+            self.current_property_type,
+        )
+
+    def completed_records(self):
+        """Records of the current unit if the run journal has it complete, else None"""
+        if self.journal is not None and self.journal.is_complete(*self.current_unit()):
+            print(f"{self.current_source} - {self.current_neighborhood}: already scraped")
+            return self.journaled_listings()
+        return None
+
+    def resume_page(self):
+        """First page of the current unit not scraped yet by this or an earlier run"""
+        page = 1 if self.journal is None else self.journal.next_page(*self.current_unit())
+        return max(page, self.last_page_done + 1)
+
+    def record_page(self, page, properties):
+        """Save a page's records to the run journal, if there is one"""
+        if self.journal is not None and properties:
+            records = [listing.to_record() for listing in properties]
+            self.journal.record_page(*self.current_unit(), page, records)
+
+    def journaled_listings(self):
+        """Every listing the run journal holds for the current unit"""
+        records = self.journal.records(*self.current_unit())
+        return [Listing.from_record(record) for record in records]
+
+    def extract_current_page(self):
+        """Extract properties from the page currently loaded in the browser"""
+        html = self.cache_current_page()
+
+        # In-browser extraction only saves work when the HTML isn't needed anyway
+        if html is None and self.extraction_engine == "js" and self.extract_script:
+            try:
+                with self.timed("extract_js") as timing:
+                    raw_cards = self.driver.execute_script(self.extract_script)
+                    timing["cards"] = len(raw_cards or [])
+                if raw_cards:
+                    return self.build_properties(raw_cards)
+                print(f"{self.current_source} - No cards found in browser, using HTML")
+            except Exception as e:
+                print(f"{self.current_source} - In-browser extraction failed: {e}")
+
+        if html is None:
+            html = self.read_page_source()
+        return self.extract_properties_from_html(html)
+
+    def read_page_source(self):
+        """Transfer the loaded page's HTML out of the browser"""
+        with self.timed("page_source") as timing:
+            html = self.driver.page_source
+            timing["bytes"] = len(html.encode("utf-8"))
+        return html
+
+    def cache_current_page(self):
+        """Store the loaded page in the page cache and return its HTML (None without a cache)"""
+        if self.page_cache is None:
+            return None
+
+        html = self.read_page_source()
+        self.page_cache.store(
+            self.current_source,
+            self.driver.current_url,
+            html,
+            neighborhood=self.current_neighborhood,
+            property_type=self.current_property_type,
+        )
+        return html
+
+    def replay(self, page_cache, since=None, until=None):
+        """Re-run extraction over this source's cached pages, without a browser"""
+        properties = []
+        for entry in page_cache.entries(self.current_source, since, until):
+            self.current_neighborhood = entry["neighborhood"]
+            self.current_property_type = entry["property_type"]
+            properties.extend(self.extract_properties_from_html(page_cache.load(entry)))
+        return properties
+
+    def make_soup(self, html):
+        """Parse page HTML with the configured backend, keeping only listing cards"""
+        return BeautifulSoup(html, self.parser_backend, parse_only=self.card_strainer)
+
+    def extract_properties_from_html(self, html):
+        """Extract properties from a page's HTML, e.g. an archived page"""
+        with self.timed("parse"):
+            soup = self.make_soup(html)
+        with self.timed("extract") as timing:
+            properties = self.extract_properties(soup)
+            timing["cards"] = len(properties)
+        return properties
+
+    def build_properties(self, raw_cards):
+        """Build Listings from raw card fields, skipping unusable cards"""
+        properties = []
+        for raw in raw_cards:
+            try:
+                property_data = self.build_property(raw)
+            except Exception as e:
+                print(f"Error extracting {self.current_source} data from card: {e}")
+                continue
+            if property_data:
+                properties.append(property_data)
+        return properties
+
     def try_selectors(self, element, selectors):
         """Try multiple selectors and return the first match's text"""
         for selector in selectors:
             try:
-                found_element = element.select_one(selector)
+                if isinstance(selector, sv.SoupSieve):
+                    found_element = selector.select_one(element)
+                else:
+                    found_element = element.select_one(selector)
                 if found_element:
                     return found_element.text.strip()
             except:
@@ -72,5 +500,11 @@ class BaseScraper:
         return None
 
     def close(self):
-        """Close the webdriver"""
-        self.driver.quit()
+        """Close the webdriver, or hand it back to the pool it was leased from"""
+        if self.driver is None:
+            return
+        if self.driver_pool is not None:
+            self.driver_pool.release(self.driver, pages=self.pages_loaded)
+            self.pages_loaded = 0
+        else:
+            self.driver.quit()
@@ -0,0 +1,349 @@
+import time
+import queue
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from scrapers.zillow_scraper import ZillowScraper
+from scrapers.streeteasy_scraper import StreetEasyScraper
+from scrapers.apartments_scraper import ApartmentsScraper
+from scrapers.dedup import dedupe_listings
+from scrapers.diff import events_to_frame
+from scrapers.driver_pool import DriverPool
+from scrapers.journal import RunJournal
+from scrapers.listing import Listing, listings_to_frame
+from scrapers.neighborhoods import get_detailed_neighborhoods
+from scrapers.rate_limit import RateLimiter
+from scrapers.timing import PhaseTimer
+from scrapers.watchdog import RETRYABLE_ERRORS, Watchdog
+
+SCRAPER_CLASSES = {
+    "zillow": ZillowScraper,
+    "streeteasy": StreetEasyScraper,
+    "apartments.com": ApartmentsScraper,
+}
+
+# Maximum number of browsers allowed to work on one source at the same time
+DEFAULT_SOURCE_LIMITS = {
+    "zillow": 2,
+    "streeteasy": 2,
+    "apartments.com": 2,
+}
+
+
+class ParallelCrawler:
+    """Fan (source, neighborhood, property_type) jobs out over a pool of scrapers"""
+
+    def __init__(
+        self,
+        sources=None,
+        max_workers=4,
+        source_limits=None,
+        headless=True,
+        max_pages=3,
+        job_delay=None,
+        driver_pool=None,
+        extraction_engines=None,
+        rate_limiter=None,
+        journal=None,
+        page_cache=None,
+        dataset=None,
+        history=None,
+        timer=None,
+        lean_sources=None,
+        memory_governor=None,
+        watchdog=None,
+        differ=None,
+        cube=None,
+    ):
+        self.sources = list(sources or SCRAPER_CLASSES)
+        self.max_workers = max_workers
+        self.headless = headless
+        self.max_pages = max_pages
+        self.job_delay = job_delay
+        # With a driver pool, scrapers are cheap wrappers created per job around
+        # a leased browser instead of each owning a browser for the whole run
+        self.driver_pool = driver_pool
+        # Per-source extraction engine ("soup" or "js"), defaulting to "soup"
+        self.extraction_engines = extraction_engines or {}
+        # Sources browsed in lean mode (no images, fonts, map tiles or trackers);
+        # leave out any source whose pages don't render with them blocked
+        self.lean_sources = set(lean_sources or ())
+        # Optional MemoryGovernor restarting bloated browsers between jobs
+        self.memory_governor = memory_governor
+        # Optional Watchdog with page timeouts and a hard deadline per job
+        self.watchdog = watchdog
+        # Optional ListingDiff reporting what changed since the previous run
+        self.differ = differ
+        # Optional PriceCube updated with each run's aggregates
+        self.cube = cube
+        # Every scraper shares one limiter, so each domain is held to its own
+        # request rate however many workers are crawling it
+        self.rate_limiter = rate_limiter or RateLimiter()
+        # RunJournal shared by all scrapers; finished units are skipped on restart
+        self.journal = journal
+        # Optional PageCache archiving every extracted page for later replay
+        self.page_cache = page_cache
+        # Optional ListingDataset each finished run is appended to
+        self.dataset = dataset
+        # Optional ListingHistory recording each listing's price over time
+        self.history = history
+        # Optional PhaseTimer shared by all scrapers, saved when a run ends
+        self.timer = timer
+
+        self.source_limits = dict(DEFAULT_SOURCE_LIMITS)
+        self.source_limits.update(source_limits or {})
+
+        # Each source keeps its own set of idle scrapers; the semaphore caps how
+        # many of them can be busy (and therefore exist) at once
+        self._slots = {
+            source: threading.Semaphore(self.source_limits[source])
+            for source in self.sources
+        }
+        self._idle = {source: queue.LifoQueue() for source in self.sources}
+        self._scrapers = []
+        self._lock = threading.Lock()
+
+    def build_jobs(self, neighborhoods, property_type="rent"):
+        """Build the job list, interleaving sources so no single cap stalls the pool"""
+        jobs = []
+        for neighborhood in neighborhoods:
+            for source in self.sources:
+                # Apartments.com only has rentals
+                if source == "apartments.com" and property_type != "rent":
+                    continue
+                jobs.append((source, neighborhood, property_type))
+        return jobs
+
+    def _create_scraper(self, source, **kwargs):
+        return SCRAPER_CLASSES[source](
+            headless=self.headless,
+            extraction_engine=self.extraction_engines.get(source, "soup"),
+            rate_limiter=self.rate_limiter,
+            journal=self.journal,
+            page_cache=self.page_cache,
+            timer=self.timer,
+            lean=source in self.lean_sources,
+            memory_governor=self.memory_governor,
+            watchdog=self.watchdog,
+            **kwargs,
+        )
+
+    def _lease_scraper(self, source):
+        """Take an idle scraper for a source, launching a new one if none is free"""
+        if self.driver_pool is not None:
+            return self._create_scraper(source, driver_pool=self.driver_pool)
+
+        try:
+            return self._idle[source].get_nowait()
+        except queue.Empty:
+            scraper = self._create_scraper(source)
+            with self._lock:
+                self._scrapers.append(scraper)
+            return scraper
+
+    def stream_job(self, source, neighborhood, property_type):
+        """Yield one neighborhood's listings page by page, on a leased scraper"""
+        if self.journal is not None and self.journal.is_complete(
+            source, neighborhood, property_type
+        ):
+            records = self.journal.records(source, neighborhood, property_type)
+            yield [Listing.from_record(record) for record in records]
+            return
+
+        with self._slots[source]:
+            scraper = self._lease_scraper(source)
+            try:
+                yield from scraper.stream_neighborhood(
+                    neighborhood, property_type, max_pages=self.max_pages
+                )
+                # Optional extra pause between jobs on the same browser
+                if self.job_delay:
+                    time.sleep(random.uniform(*self.job_delay))
+            except RETRYABLE_ERRORS:
+                # Don't leave a dead or wedged browser for the next job
+                if self.driver_pool is None:
+                    scraper.restart_driver()
+                raise
+            finally:
+                if self.driver_pool is not None:
+                    scraper.close()
+                else:
+                    self._idle[source].put(scraper)
+
+    def run_job(self, source, neighborhood, property_type):
+        """Scrape one neighborhood on a scraper leased from the source's pool"""
+        properties = []
+        for batch in self.stream_job(source, neighborhood, property_type):
+            properties.extend(batch)
+        return properties
+
+    def run(self, property_type="rent", neighborhoods=None, save=True, dedupe=False):
+        """Run every job in parallel and merge the results into one DataFrame
+
+        With dedupe, listings seen on several sources or pages appear once in
+        the DataFrame and CSV (see DedupIndex); the dataset and history still
+        get every source's copy.
+        """
+        if neighborhoods is None:
+            neighborhoods = get_detailed_neighborhoods()
+
+        jobs = self.build_jobs(neighborhoods, property_type)
+        print(
+            f"Crawling {len(jobs)} jobs with {self.max_workers} workers "
+            f"(limits: {self.source_limits})"
+        )
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self.run_job, *job): index
+                for index, job in enumerate(jobs)
+            }
+            for future in as_completed(futures):
+                index = futures[future]
+                source, neighborhood, _ = jobs[index]
+                try:
+                    results[index] = future.result()
+                    print(
+                        f"{source} - {neighborhood}: "
+                        f"{len(results[index])} properties"
+                    )
+                except Exception as e:
+                    print(f"Error scraping {source} - {neighborhood}: {e}")
+                    results[index] = []
+
+        # Merge in job order so the output is stable between runs
+        all_properties = []
+        for index in range(len(jobs)):
+            all_properties.extend(results[index])
+
+        if dedupe:
+            distinct = dedupe_listings(all_properties)
+            print(f"Deduplicated {len(all_properties)} listings to {len(distinct)}")
+            df = listings_to_frame(distinct)
+        else:
+            df = listings_to_frame(all_properties)
+        if save:
+            filename = f"nyc_{property_type}_prices_{time.strftime('%Y%m%d')}.csv"
+            df.to_csv(filename, index=False)
+            print(f"Saved data to {filename}")
+        if self.dataset is not None:
+            self.dataset.write(all_properties)
+        if self.history is not None:
+            stored = self.history.record(all_properties)
+            print(f"Recorded {stored} listings in {self.history.path}")
+        if self.differ is not None:
+            events = self.differ.update(all_properties, property_type)
+            if save:
+                filename = f"nyc_{property_type}_changes_{time.strftime('%Y%m%d')}.csv"
+                events_to_frame(events).to_csv(filename, index=False)
+                print(f"Saved {len(events)} listing changes to {filename}")
+        if self.cube is not None:
+            self.cube.update(all_properties)
+            self.cube.save()
+        if self.timer is not None:
+            self.timer.save()
+
+        return df
+
+    def stream(self, sinks, property_type="rent", neighborhoods=None):
+        """Run every job in parallel, handing each page's listings to the sinks as it lands
+
+        Workers pass batches through a small bounded queue and only this thread
+        touches the sinks, so memory holds a few pages rather than the whole
+        sweep. Sinks are closed at the end; returns the number of listings.
+        """
+        if neighborhoods is None:
+            neighborhoods = get_detailed_neighborhoods()
+
+        jobs = self.build_jobs(neighborhoods, property_type)
+        print(f"Streaming {len(jobs)} jobs with {self.max_workers} workers")
+
+        # A None batch marks the end of a job
+        batches = queue.Queue(maxsize=self.max_workers * 2)
+
+        def work(job):
+            source, neighborhood, _ = job
+            count = 0
+            try:
+                for batch in self.stream_job(*job):
+                    count += len(batch)
+                    batches.put(batch)
+                print(f"{source} - {neighborhood}: {count} properties")
+            except Exception as e:
+                print(f"Error scraping {source} - {neighborhood}: {e}")
+            finally:
+                batches.put(None)
+
+        total = 0
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for job in jobs:
+                    executor.submit(work, job)
+
+                remaining = len(jobs)
+                while remaining:
+                    batch = batches.get()
+                    if batch is None:
+                        remaining -= 1
+                        continue
+                    for sink in sinks:
+                        # Keep draining on a failing sink so workers never block
+                        try:
+                            sink.write(batch)
+                        except Exception as e:
+                            print(f"Error writing to {type(sink).__name__}: {e}")
+                    total += len(batch)
+        finally:
+            for sink in sinks:
+                sink.close()
+            if self.timer is not None:
+                self.timer.save()
+
+        return total
+
+    def close(self):
+        """Close every browser launched by the crawler"""
+        with self._lock:
+            scrapers, self._scrapers = self._scrapers, []
+        for scraper in scrapers:
+            try:
+                scraper.close()
+            except Exception as e:
+                print(f"Error closing scraper: {e}")
+
+
+def replay_cache(page_cache, sources=None, since=None, until=None, extraction_engines=None):
+    """Re-extract every cached page into one DataFrame, with no browser or network"""
+    extraction_engines = extraction_engines or {}
+    all_properties = []
+    for source in sources or SCRAPER_CLASSES:
+        scraper = SCRAPER_CLASSES[source](
+            offline=True,
+            extraction_engine=extraction_engines.get(source, "soup"),
+        )
+        properties = scraper.replay(page_cache, since, until)
+        print(f"{source} - Replayed {len(properties)} properties from cache")
+        all_properties.extend(properties)
+
+    return listings_to_frame(all_properties)
+
+
+# Example usage
+if __name__ == "__main__":
+    driver_pool = DriverPool(size=4, page_load_strategy="eager")
+    crawler = ParallelCrawler(
+        max_workers=4,
+        driver_pool=driver_pool,
+        lean_sources=SCRAPER_CLASSES,
+        journal=RunJournal.for_run("rent"),
+        timer=PhaseTimer.for_run("rent"),
+        watchdog=Watchdog(log_path="runs/watchdog.jsonl"),
+    )
+
+    try:
+        rental_data = crawler.run(property_type="rent")
+    finally:
+        crawler.close()
+        driver_pool.close()
@@ -0,0 +1,242 @@
+import os
+import gzip
+import json
+import math
+import time
+import datetime
+
+import pandas as pd
+
+from scrapers.dedup import price_band
+
+DIMENSIONS = ("neighborhood", "beds", "source", "week", "property_type")
+
+# Listings with this many bedrooms or more share one "4+" bucket
+MAX_BEDS = 4.0
+
+# Histogram bins are log-scale, each this much wider than the one below (5%),
+# so quantiles read off them are within about 2.5% of the true value
+BIN_WIDTH = 0.05
+
+
+def week_of(date):
+    """Monday of the ISO week a "YYYY-MM-DD" date falls in"""
+    day = datetime.date.fromisoformat(date)
+    return (day - datetime.timedelta(days=day.weekday())).isoformat()
+
+
+def beds_bucket(beds):
+    if beds is None or (isinstance(beds, float) and math.isnan(beds)):
+        return None
+    return min(float(beds), MAX_BEDS)
+
+
+def unit_of(key):
+    """The (neighborhood, source, property_type) unit a cell key belongs to"""
+    return key[0], key[2], key[4]
+
+
+class CubeCell:
+    """Count, sum, min, max and a log-scale histogram of prices"""
+
+    __slots__ = ("count", "total", "min", "max", "bins")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.bins = {}
+
+    def add(self, price):
+        self.count += 1
+        self.total += price
+        self.min = price if self.min is None else min(self.min, price)
+        self.max = price if self.max is None else max(self.max, price)
+        band = price_band(price, BIN_WIDTH)
+        self.bins[band] = self.bins.get(band, 0) + 1
+
+    def merge(self, other):
+        self.count += other.count
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+        for band, count in other.bins.items():
+            self.bins[band] = self.bins.get(band, 0) + count
+        return self
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def quantile(self, q):
+        """Approximate q-th quantile: the middle of the histogram bin it falls in"""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for band in sorted(self.bins, key=lambda b: (b is not None, b)):
+            seen += self.bins[band]
+            if rank < seen:
+                if band is None:
+                    return 0.0
+                middle = (1 + BIN_WIDTH) ** (band + 0.5)
+                return min(max(middle, self.min), self.max)
+        return self.max
+
+    def to_row(self):
+        # None (zero prices) can't be a JSON key, so bins are [band, count] pairs
+        return [self.count, self.total, self.min, self.max, list(self.bins.items())]
+
+    @classmethod
+    def from_row(cls, row):
+        cell = cls()
+        cell.count, cell.total, cell.min, cell.max, bins = row
+        cell.bins = {band: count for band, count in bins}
+        return cell
+
+
+class PriceCube:
+    """Price aggregates over neighborhood x beds x source x week x property type
+
+    Each run adds its listings to the cells of its week. A later run in the
+    same week replaces that week's cells for the source/neighborhood/property
+    type units it scraped, so a cell describes the latest run of its week
+    rather than counting a listing once per day. rollup() merges cells up to
+    any subset of DIMENSIONS, so its cost depends on the number of cells, not
+    on how many listings have been scraped. Rent and sale prices only make
+    sense apart, so queries should filter or group by property_type.
+    """
+
+    def __init__(self, path="price_cube.json.gz"):
+        self.path = path
+        self.cells = {}
+        if path and os.path.exists(path):
+            self.load()
+
+    def update(self, listings, run_date=None):
+        """Add one run's listings; returns the number of cells touched"""
+        rows = [
+            (
+                listing.neighborhood,
+                listing.beds,
+                listing.source,
+                listing.property_type,
+                listing.price,
+            )
+            for listing in listings
+        ]
+        return self.add_rows(rows, run_date or time.strftime("%Y-%m-%d"))
+
+    def add_rows(self, rows, run_date):
+        """Add (neighborhood, beds, source, property_type, price) rows from one run"""
+        week = week_of(run_date)
+        cells = {}
+        for neighborhood, beds, source, property_type, price in rows:
+            if price is None or math.isnan(price):
+                continue
+            key = (neighborhood, beds_bucket(beds), source, week, property_type)
+            cell = cells.get(key)
+            if cell is None:
+                cell = cells[key] = CubeCell()
+            cell.add(price)
+
+        scraped = {unit_of(key) for key in cells}
+        for key in [
+            key for key in self.cells if key[3] == week and unit_of(key) in scraped
+        ]:
+            del self.cells[key]
+        self.cells.update(cells)
+        return len(cells)
+
+    def rebuild(self, dataset):
+        """Rebuild the cube from every run stored in a ListingDataset"""
+        df = dataset.read(
+            columns=["date", "source", "neighborhood", "property_type", "beds", "price"]
+        )
+        self.cells = {}
+        for run_date, group in df.groupby("date", sort=True):
+            rows = zip(
+                group["neighborhood"].astype(str),
+                group["beds"].astype(float),
+                group["source"].astype(str),
+                group["property_type"].astype(str),
+                group["price"].astype(float),
+            )
+            self.add_rows(rows, run_date)
+        print(f"Rebuilt price cube: {len(self.cells)} cells")
+
+    def rollup(self, by=("neighborhood",), **filters):
+        """Merge cells into one per combination of the `by` dimensions
+
+        Filters restrict any dimension to one value or a list of values, e.g.
+        rollup(("week",), property_type="rent", beds=[1.0, 2.0]).
+        """
+        positions = [DIMENSIONS.index(dimension) for dimension in by]
+        allowed = {}
+        for dimension, value in filters.items():
+            if dimension not in DIMENSIONS:
+                raise ValueError(f"Unknown cube dimension: {dimension}")
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            if dimension == "beds":
+                values = [beds_bucket(v) for v in values]
+            allowed[DIMENSIONS.index(dimension)] = set(values)
+
+        groups = {}
+        for key, cell in self.cells.items():
+            if any(key[position] not in values for position, values in allowed.items()):
+                continue
+            group = tuple(key[position] for position in positions)
+            if group not in groups:
+                groups[group] = CubeCell()
+            groups[group].merge(cell)
+        return groups
+
+    def frame(self, by=("neighborhood",), quantiles=(0.5,), **filters):
+        """rollup() as a DataFrame indexed by the `by` dimensions"""
+        rows = []
+        for group, cell in self.rollup(by, **filters).items():
+            row = dict(zip(by, group))
+            row.update(
+                count=cell.count,
+                mean=cell.mean(),
+                min=cell.min,
+                max=cell.max,
+            )
+            for q in quantiles:
+                row["median" if q == 0.5 else f"p{q * 100:g}"] = cell.quantile(q)
+            rows.append(row)
+
+        df = pd.DataFrame(rows)
+        if by and len(df):
+            df = df.set_index(list(by)).sort_index()
+        return df
+
+    def save(self, path=None):
+        """Write the cube as gzipped JSON, replacing the file atomically"""
+        path = path or self.path
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, "wt") as f:
+            json.dump(
+                {
+                    "dimensions": DIMENSIONS,
+                    "cells": [list(key) + cell.to_row() for key, cell in self.cells.items()],
+                },
+                f,
+            )
+        os.replace(tmp_path, path)
+        print(f"Saved price cube ({len(self.cells)} cells) to {path}")
+
+    def load(self, path=None):
+        with gzip.open(path or self.path, "rt") as f:
+            data = json.load(f)
+        if tuple(data["dimensions"]) != DIMENSIONS:
+            raise ValueError(
+                f"Price cube {path or self.path} has dimensions {data['dimensions']}, "
+                f"not {list(DIMENSIONS)}; rebuild() it from the dataset"
+            )
+        size = len(DIMENSIONS)
+        self.cells = {
+            tuple(row[:size]): CubeCell.from_row(row[size:]) for row in data["cells"]
+        }
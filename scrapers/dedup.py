@@ -0,0 +1,148 @@
+import math
+
+from scrapers.addresses import split_address
+from scrapers.listing import Listing
+from scrapers.sinks import ListingSink
+
+NUMERIC_FIELDS = ("price", "beds", "baths", "sqft")
+
+
+def price_band(price, tolerance):
+    """Log-scale bucket of a price, each band `tolerance` wide (None without a price)"""
+    if not price or price <= 0:
+        return None
+    return math.floor(math.log(price) / math.log1p(tolerance))
+
+
+class DuplicateGroup:
+    """One distinct listing and every copy of it seen so far"""
+
+    __slots__ = ("listing", "sources", "copies")
+
+    def __init__(self, listing):
+        # A copy, so merging never changes listings the caller still holds
+        self.listing = Listing(
+            listing.source,
+            listing.neighborhood,
+            listing.property_type,
+            address=listing.address,
+            price=listing.price,
+            beds=listing.beds,
+            baths=listing.baths,
+            sqft=listing.sqft,
+            extra=dict(listing.extra) if listing.extra else None,
+        )
+        self.sources = [listing.source]
+        self.copies = 1
+
+    def merge(self, listing):
+        """Count another copy, filling in fields the first one was missing"""
+        self.copies += 1
+        if listing.source not in self.sources:
+            self.sources.append(listing.source)
+        for field in NUMERIC_FIELDS:
+            if getattr(self.listing, field) is None:
+                setattr(self.listing, field, getattr(listing, field))
+
+    def to_listing(self):
+        """The merged listing, with provenance in extra (seen_on, copies)"""
+        extra = dict(self.listing.extra or {})
+        extra["seen_on"] = ",".join(self.sources)
+        extra["copies"] = self.copies
+        self.listing.extra = extra
+        return self.listing
+
+
+class DedupIndex:
+    """Hash index merging copies of the same listing across sources and pages
+
+    Listings match on canonical street + unit + beds and a price within
+    `price_tolerance` of each other. Prices are bucketed into log-scale bands
+    of that width and only the neighbouring bands are probed, so each add()
+    is O(1) and a whole run O(n). Listings without an address can't be
+    matched and are all kept.
+    """
+
+    def __init__(self, price_tolerance=0.05):
+        self.price_tolerance = price_tolerance
+        self._index = {}
+        self._groups = []
+
+    def find(self, listing, street, unit, band):
+        """The group a listing (with its parsed street, unit and band) is a copy of, or None"""
+        bands = [None] if band is None else [band, band - 1, band + 1]
+        for candidate in bands:
+            for group in self._index.get((street, unit, listing.beds, candidate), ()):
+                known = group.listing.price
+                if band is None or (
+                    abs(listing.price - known) <= self.price_tolerance * known
+                ):
+                    return group
+        return None
+
+    def add(self, listing):
+        """Index a listing; returns True if it is new, False if it was a copy"""
+        street, unit = split_address(listing.address)
+        if not street:
+            self._groups.append(DuplicateGroup(listing))
+            return True
+
+        band = price_band(listing.price, self.price_tolerance)
+        group = self.find(listing, street, unit, band)
+        if group is not None:
+            group.merge(listing)
+            return False
+
+        group = DuplicateGroup(listing)
+        self._groups.append(group)
+        self._index.setdefault((street, unit, listing.beds, band), []).append(group)
+        return True
+
+    def add_all(self, listings):
+        """Index a batch and return the listings in it not seen before"""
+        return [listing for listing in listings if self.add(listing)]
+
+    def listings(self):
+        """Every distinct listing, in first-seen order, with provenance"""
+        return [group.to_listing() for group in self._groups]
+
+    def duplicates(self):
+        """Number of copies merged away"""
+        return sum(group.copies - 1 for group in self._groups)
+
+    def __len__(self):
+        return len(self._groups)
+
+
+def dedupe_listings(listings, price_tolerance=0.05):
+    """Merge duplicate listings, keeping the first copy of each plus provenance"""
+    index = DedupIndex(price_tolerance)
+    for listing in listings:
+        index.add(listing)
+    return index.listings()
+
+
+class DedupSink(ListingSink):
+    """Pass only listings not seen before on to other sinks
+
+    Copies arriving later still update `index`, whose listings() has the
+    full provenance once the run is over.
+    """
+
+    def __init__(self, *sinks, price_tolerance=0.05):
+        self.sinks = sinks
+        self.index = DedupIndex(price_tolerance)
+
+    def write(self, listings):
+        new = self.index.add_all(listings)
+        if new:
+            for sink in self.sinks:
+                sink.write(new)
+
+    def close(self):
+        print(
+            f"Deduplicated {len(self.index) + self.index.duplicates()} listings "
+            f"to {len(self.index)}"
+        )
+        for sink in self.sinks:
+            sink.close()
@@ -0,0 +1,207 @@
+import os
+import gzip
+import json
+import time
+
+import pandas as pd
+
+from scrapers.addresses import listing_key
+from scrapers.sinks import ListingSink
+
+EVENT_COLUMNS = [
+    "event",
+    "property_type",
+    "source",
+    "neighborhood",
+    "address",
+    "old_price",
+    "new_price",
+    "change_pct",
+    "key",
+]
+
+
+def snapshot_entries(listings, property_type=None):
+    """Compact {key: [source, neighborhood, address, price]} entries of one property type"""
+    entries = {}
+    for listing in listings:
+        if listing.address:
+            key = listing_key(
+                listing.source, property_type or listing.property_type, listing.address
+            )
+            # Later pages win when a listing shows up twice in one run
+            entries[key] = [
+                listing.source,
+                listing.neighborhood,
+                listing.address,
+                listing.price,
+            ]
+    return entries
+
+
+def diff_entries(previous, current, property_type, min_change=0.0):
+    """New, removed and price-changed events between two snapshots, in one pass
+
+    Only (source, neighborhood) pairs present in the current snapshot are
+    compared, so a unit that failed or wasn't scraped this run doesn't show
+    up as all of its listings being removed.
+    """
+    events = []
+    for key, (source, neighborhood, address, price) in current.items():
+        old = previous.get(key)
+        if old is None:
+            events.append(
+                event("new", property_type, key, source, neighborhood, address, None, price)
+            )
+            continue
+
+        old_price = old[3]
+        if old_price and price and price != old_price:
+            change = (price - old_price) / old_price
+            if abs(change) > min_change:
+                events.append(
+                    event(
+                        "price_changed",
+                        property_type,
+                        key,
+                        source,
+                        neighborhood,
+                        address,
+                        old_price,
+                        price,
+                    )
+                )
+
+    scraped = {(entry[0], entry[1]) for entry in current.values()}
+    for key, (source, neighborhood, address, price) in previous.items():
+        if key not in current and (source, neighborhood) in scraped:
+            events.append(
+                event("removed", property_type, key, source, neighborhood, address, price, None)
+            )
+    return events
+
+
+def upgrade_key(key, property_type):
+    """source|street|unit -> source|property_type|street|unit"""
+    source, rest = key.split("|", 1)
+    return f"{source}|{property_type}|{rest}"
+
+
+def event(kind, property_type, key, source, neighborhood, address, old_price, new_price):
+    change_pct = None
+    if old_price and new_price:
+        change_pct = round((new_price - old_price) / old_price * 100, 2)
+    return {
+        "event": kind,
+        "property_type": property_type,
+        "source": source,
+        "neighborhood": neighborhood,
+        "address": address,
+        "old_price": old_price,
+        "new_price": new_price,
+        "change_pct": change_pct,
+        "key": key,
+    }
+
+
+class ListingDiff:
+    """Compare each run with the previous one: new, removed and re-priced listings
+
+    The latest known state of every listing is kept as one gzipped JSON
+    snapshot per property type. update() diffs a run against it with a single
+    hash join and writes the new snapshot, so the work grows with the size of
+    the run, not with how many runs came before.
+    """
+
+    def __init__(self, directory="snapshots", min_change=0.0):
+        self.directory = directory
+        # Relative price moves up to this size are ignored (0.01 = 1%)
+        self.min_change = min_change
+        os.makedirs(directory, exist_ok=True)
+
+    def snapshot_path(self, property_type):
+        return os.path.join(self.directory, f"{property_type}.json.gz")
+
+    def load(self, property_type):
+        """The last saved snapshot entries of a property type ({} before the first run)"""
+        try:
+            with gzip.open(self.snapshot_path(property_type), "rt") as f:
+                entries = json.load(f)["listings"]
+        except FileNotFoundError:
+            return {}
+        # Snapshots from before keys carried the property type (source|street|unit)
+        return {
+            upgrade_key(key, property_type) if key.count("|") == 2 else key: entry
+            for key, entry in entries.items()
+        }
+
+    def save(self, property_type, entries):
+        path = self.snapshot_path(property_type)
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, "wt") as f:
+            json.dump({"taken_at": time.time(), "listings": entries}, f)
+        os.replace(tmp_path, path)
+
+    def update(self, listings, property_type=None):
+        """Diff a run's listings against the snapshot, save the new one and return the events
+
+        Listings are grouped by their own property_type unless one is given.
+        """
+        by_type = {}
+        for listing in listings:
+            by_type.setdefault(property_type or listing.property_type, []).append(listing)
+
+        events = []
+        for kind, group in by_type.items():
+            events.extend(self.apply(kind, snapshot_entries(group, kind)))
+        return events
+
+    def apply(self, property_type, current):
+        """Diff snapshot entries against the saved snapshot and save the result"""
+        previous = self.load(property_type)
+        events = diff_entries(previous, current, property_type, self.min_change)
+
+        # Listings of units not scraped this run carry over unchanged
+        scraped = {(entry[0], entry[1]) for entry in current.values()}
+        merged = {
+            key: entry
+            for key, entry in previous.items()
+            if (entry[0], entry[1]) not in scraped
+        }
+        merged.update(current)
+        self.save(property_type, merged)
+
+        counts = {}
+        for e in events:
+            counts[e["event"]] = counts.get(e["event"], 0) + 1
+        print(f"{property_type} listing changes: {counts or 'none'}")
+        return events
+
+
+def events_to_frame(events):
+    return pd.DataFrame(events, columns=EVENT_COLUMNS)
+
+
+class DiffSink(ListingSink):
+    """Collect a streamed run and diff it against the previous snapshot on close
+
+    Only the compact keys and prices are kept, not the listings themselves.
+    """
+
+    def __init__(self, differ, path=None):
+        self.differ = differ
+        self.path = path
+        self.events = []
+        self._entries = {}
+
+    def write(self, listings):
+        for listing in listings:
+            entries = self._entries.setdefault(listing.property_type, {})
+            entries.update(snapshot_entries([listing]))
+
+    def close(self):
+        for property_type, entries in self._entries.items():
+            self.events.extend(self.differ.apply(property_type, entries))
+        if self.path:
+            events_to_frame(self.events).to_csv(self.path, index=False)
+            print(f"Saved {len(self.events)} listing changes to {self.path}")
@@ -0,0 +1,300 @@
+import os
+import json
+import time
+import queue
+import threading
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.chrome.options import Options
+from webdriver_manager.chrome import ChromeDriverManager
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36"
+
+# Where the resolved chromedriver path is remembered between runs
+DRIVER_CACHE_FILE = os.path.join(
+    os.path.expanduser("~"), ".cache", "nyc-rentals", "chromedriver.json"
+)
+# Re-run the driver-manager version check once a day at most
+DRIVER_CACHE_MAX_AGE = 24 * 60 * 60
+
+# URL patterns blocked in lean mode, by kind of resource. Cards are read as
+# text, so none of these are needed to extract listings.
+BLOCKED_RESOURCES = {
+    "images": ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico"],
+    "media": ["*.mp4", "*.webm", "*.m3u8", "*.mp3"],
+    "fonts": ["*.woff", "*.woff2", "*.ttf", "*.otf", "*fonts.googleapis.com*"],
+    "maps": ["*maps.googleapis.com/maps/vt*", "*maps.gstatic.com*", "*tiles.mapbox.com*"],
+    "trackers": [
+        "*google-analytics.com*",
+        "*googletagmanager.com*",
+        "*doubleclick.net*",
+        "*googlesyndication.com*",
+        "*facebook.net*",
+        "*connect.facebook.com*",
+        "*hotjar.com*",
+        "*nr-data.net*",
+        "*newrelic.com*",
+        "*segment.io*",
+        "*optimizely.com*",
+        "*adsrvr.org*",
+        "*criteo.com*",
+        "*amazon-adsystem.com*",
+        "*bing.com/bat*",
+    ],
+}
+LEAN_RESOURCES = tuple(BLOCKED_RESOURCES)
+
+# How often a caller waiting for a pooled browser re-checks for a free slot
+ACQUIRE_POLL_INTERVAL = 1.0
+
+_driver_path = None
+_driver_path_lock = threading.Lock()
+
+
+def resolve_chromedriver(cache_file=DRIVER_CACHE_FILE, max_age=DRIVER_CACHE_MAX_AGE):
+    """Return the chromedriver binary path, only asking ChromeDriverManager when the cache is stale"""
+    global _driver_path
+
+    with _driver_path_lock:
+        if _driver_path and os.path.exists(_driver_path):
+            return _driver_path
+
+        try:
+            with open(cache_file) as f:
+                cached = json.load(f)
+            if (
+                os.path.exists(cached["path"])
+                and time.time() - cached["resolved_at"] < max_age
+            ):
+                _driver_path = cached["path"]
+                return _driver_path
+        except (OSError, ValueError, KeyError):
+            pass
+
+        _driver_path = ChromeDriverManager().install()
+
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            with open(cache_file, "w") as f:
+                json.dump({"path": _driver_path, "resolved_at": time.time()}, f)
+        except OSError as e:
+            print(f"Could not write chromedriver cache {cache_file}: {e}")
+
+        return _driver_path
+
+
+def build_chrome_options(headless=True, user_agent=USER_AGENT, page_load_strategy="normal"):
+    """Build the Chrome options shared by every scraper browser
+
+    An "eager" page load strategy returns from driver.get() once the DOM is
+    ready instead of waiting for every image and script; scrapers wait for
+    their cards explicitly anyway.
+    """
+    chrome_options = Options()
+    chrome_options.page_load_strategy = page_load_strategy
+
+    if headless:
+        chrome_options.add_argument("--headless")
+
+    # Add realistic user agent
+    chrome_options.add_argument(f"user-agent={user_agent}")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option("useAutomationExtension", False)
+    return chrome_options
+
+
+def launch_driver(headless=True, page_load_strategy="normal"):
+    """Launch a new Chrome instance using the cached chromedriver binary"""
+    driver = webdriver.Chrome(
+        service=Service(resolve_chromedriver()),
+        options=build_chrome_options(headless, page_load_strategy=page_load_strategy),
+    )
+    driver.execute_script(
+        "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
+    )
+    return driver
+
+
+def set_resource_blocking(driver, resources=()):
+    """Block the given BLOCKED_RESOURCES kinds in a browser; () lifts any blocking
+
+    Uses the DevTools Network domain of the driver's current tab only, so it
+    has to be set again in every new tab or window before it navigates. It
+    can be switched per lease of a pooled driver.
+    """
+    patterns = [pattern for kind in resources for pattern in BLOCKED_RESOURCES[kind]]
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+    except Exception as e:
+        print(f"Could not set resource blocking: {e}")
+
+
+class DriverPool:
+    """Keep a set of warm Chrome instances and lease them out to scrapers"""
+
+    def __init__(
+        self,
+        size=2,
+        headless=True,
+        max_pages=50,
+        prelaunch=True,
+        page_load_strategy="normal",
+    ):
+        self.size = size
+        self.headless = headless
+        self.page_load_strategy = page_load_strategy
+        # Recycle a browser once it has loaded this many pages
+        self.max_pages = max_pages
+
+        self._idle = queue.LifoQueue()
+        self._pages = {}
+        self._launched = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+        if prelaunch:
+            self.prelaunch()
+
+    def prelaunch(self):
+        """Launch browsers in parallel until the pool is full"""
+        with self._lock:
+            missing = self.size - self._launched
+            self._launched += missing
+
+        threads = [
+            threading.Thread(target=self._prelaunch_one) for _ in range(missing)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def _prelaunch_one(self):
+        try:
+            self._idle.put(self._launch())
+        except Exception as e:
+            print(f"Error launching pooled browser: {e}")
+            with self._lock:
+                self._launched -= 1
+
+    def _launch(self):
+        driver = launch_driver(self.headless, self.page_load_strategy)
+        self._pages[id(driver)] = 0
+        return driver
+
+    def acquire(self, timeout=None):
+        """Lease a browser, launching one if the pool is not full yet
+
+        Waits up to `timeout` seconds (forever with None) for a browser to be
+        released, raising TimeoutError after that. Waiters check now and then
+        whether a failed relaunch freed a slot, so they can launch into it.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self._closed:
+                raise RuntimeError("Driver pool is closed")
+
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+
+            with self._lock:
+                can_launch = self._launched < self.size
+                if can_launch:
+                    self._launched += 1
+
+            if can_launch:
+                try:
+                    return self._launch()
+                except Exception:
+                    with self._lock:
+                        self._launched -= 1
+                    raise
+
+            wait = ACQUIRE_POLL_INTERVAL
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"No pooled browser free after {timeout}s")
+                wait = min(wait, remaining)
+            try:
+                return self._idle.get(timeout=wait)
+            except queue.Empty:
+                continue
+
+    def release(self, driver, pages=0):
+        """Return a leased browser, resetting it or recycling it when worn out"""
+        self._pages[id(driver)] = self._pages.get(id(driver), 0) + pages
+
+        if self._closed:
+            self._quit(driver)
+            return
+
+        if self._pages[id(driver)] >= self.max_pages:
+            print(f"Recycling browser after {self._pages[id(driver)]} pages")
+            self._replace(driver)
+            return
+
+        try:
+            self.reset(driver)
+        except Exception as e:
+            print(f"Error resetting pooled browser, replacing it: {e}")
+            self._replace(driver)
+            return
+
+        self._idle.put(driver)
+
+    def recycle(self, driver):
+        """Quit a leased browser and put a fresh one in the pool in its place"""
+        if self._closed:
+            self._quit(driver)
+        else:
+            self._replace(driver)
+
+    def reset(self, driver):
+        """Clear cookies, storage and extra tabs so the next lease starts clean"""
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+
+        try:
+            driver.execute_script(
+                "window.localStorage.clear(); window.sessionStorage.clear();"
+            )
+        except Exception:
+            pass
+        driver.delete_all_cookies()
+        driver.get("about:blank")
+
+    def _replace(self, driver):
+        self._quit(driver)
+        try:
+            self._idle.put(self._launch())
+        except Exception as e:
+            print(f"Error relaunching pooled browser: {e}")
+            with self._lock:
+                self._launched -= 1
+
+    def _quit(self, driver):
+        self._pages.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f"Error closing pooled browser: {e}")
+
+    def close(self):
+        """Quit every idle browser; leased ones are quit when released"""
+        self._closed = True
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._quit(driver)
@@ -0,0 +1,282 @@
+import sqlite3
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+from scrapers.addresses import listing_key, split_address
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    listing_key TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    neighborhood TEXT,
+    property_type TEXT,
+    address TEXT,
+    street TEXT,
+    unit TEXT,
+    beds REAL,
+    baths REAL,
+    sqft REAL,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    last_price REAL
+);
+
+CREATE TABLE IF NOT EXISTS price_observations (
+    listing_key TEXT NOT NULL REFERENCES listings (listing_key),
+    observed_at TEXT NOT NULL,
+    price REAL,
+    neighborhood TEXT,
+    property_type TEXT,
+    PRIMARY KEY (listing_key, observed_at)
+);
+
+CREATE INDEX IF NOT EXISTS observations_by_area
+    ON price_observations (neighborhood, property_type, observed_at);
+
+CREATE INDEX IF NOT EXISTS listings_by_area
+    ON listings (neighborhood, property_type, last_seen);
+
+CREATE INDEX IF NOT EXISTS listings_by_street
+    ON listings (street, unit);
+"""
+
+# New sightings refresh the listing's details, but a card that didn't show a
+# field keeps the value from an earlier sighting
+UPSERT_LISTING = """
+INSERT INTO listings (
+    listing_key, source, neighborhood, property_type, address, street, unit,
+    beds, baths, sqft, first_seen, last_seen, last_price
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (listing_key) DO UPDATE SET
+    neighborhood = excluded.neighborhood,
+    property_type = excluded.property_type,
+    address = coalesce(excluded.address, address),
+    beds = coalesce(excluded.beds, beds),
+    baths = coalesce(excluded.baths, baths),
+    sqft = coalesce(excluded.sqft, sqft),
+    first_seen = min(first_seen, excluded.first_seen),
+    last_seen = max(last_seen, excluded.last_seen),
+    last_price = CASE
+        WHEN excluded.last_seen >= last_seen THEN coalesce(excluded.last_price, last_price)
+        ELSE last_price
+    END
+"""
+
+UPSERT_OBSERVATION = """
+INSERT INTO price_observations (listing_key, observed_at, price, neighborhood, property_type)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (listing_key, observed_at) DO UPDATE SET price = excluded.price
+"""
+
+
+class ListingHistory:
+    """SQLite store of every listing seen and the prices it was seen at
+
+    Listings are keyed by source + property type + canonical street + unit
+    (see scrapers.addresses), so the same unit scraped on later runs updates
+    one row in `listings` and adds a row to `price_observations`, while its
+    rent and sale listings are kept apart.
+    """
+
+    def __init__(self, path="listing_history.db"):
+        self.path = path
+        # Crawler worker threads share the connection, so writes are serialised
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._migrate_keys()
+
+    def _migrate_keys(self):
+        """Move listings keyed source|street|unit to source|property_type|street|unit
+
+        Old keys lumped a unit's rent and sale listings together. Their
+        observations still carry their own property type, so each one is
+        re-keyed by it and the listing rows are rebuilt from them.
+        """
+        old = "listing_key NOT LIKE '%|%|%|%'"
+        if self._conn.execute(f"SELECT 1 FROM listings WHERE {old} LIMIT 1").fetchone() is None:
+            return
+
+        new_key = "l.source || '|' || coalesce({}, '') || '|' || l.street || '|' || l.unit"
+        # Observations are re-keyed before their listing rows, which
+        # foreign_keys=ON would reject mid-transaction
+        self._conn.execute("PRAGMA foreign_keys=OFF")
+        with self._conn:
+            self._conn.execute(
+                f"""
+                INSERT INTO listings (
+                    listing_key, source, neighborhood, property_type, address, street, unit,
+                    beds, baths, sqft, first_seen, last_seen, last_price
+                )
+                SELECT {new_key.format("o.property_type")}, l.source, max(o.neighborhood),
+                       o.property_type, l.address, l.street, l.unit, l.beds, l.baths,
+                       l.sqft, min(o.observed_at), max(o.observed_at), NULL
+                FROM price_observations o JOIN listings l USING (listing_key)
+                WHERE l.{old} AND o.property_type IS NOT l.property_type
+                GROUP BY l.listing_key, o.property_type
+                """
+            )
+            self._conn.execute(
+                f"""
+                UPDATE price_observations SET listing_key = (
+                    SELECT {new_key.format("price_observations.property_type")}
+                    FROM listings l WHERE l.listing_key = price_observations.listing_key
+                )
+                WHERE listing_key IN (SELECT listing_key FROM listings WHERE {old})
+                """
+            )
+            self._conn.execute(
+                f"""
+                UPDATE listings SET listing_key =
+                    source || '|' || coalesce(property_type, '') || '|' || street || '|' || unit
+                WHERE {old}
+                """
+            )
+            # Seen times and last price of a re-keyed listing are its own again
+            self._conn.execute(
+                """
+                UPDATE listings SET
+                    first_seen = (SELECT min(observed_at) FROM price_observations o
+                                  WHERE o.listing_key = listings.listing_key),
+                    last_seen = (SELECT max(observed_at) FROM price_observations o
+                                 WHERE o.listing_key = listings.listing_key),
+                    last_price = (SELECT price FROM price_observations o
+                                  WHERE o.listing_key = listings.listing_key
+                                  ORDER BY observed_at DESC LIMIT 1)
+                WHERE listing_key IN (SELECT listing_key FROM price_observations)
+                """
+            )
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        print(f"Re-keyed {self.path} listings by property type")
+
+    def record(self, listings, observed_at=None):
+        """Upsert listings and their prices in one transaction; returns the number stored
+
+        observed_at is an ISO timestamp shared by the whole batch, defaulting
+        to now. Listings without an address can't be keyed and are skipped.
+        """
+        observed_at = observed_at or datetime.now().isoformat(timespec="seconds")
+
+        listing_rows = []
+        observation_rows = []
+        for listing in listings:
+            if not listing.address:
+                continue
+            street, unit = split_address(listing.address)
+            key = listing_key(listing.source, listing.property_type, listing.address)
+            listing_rows.append(
+                (
+                    key,
+                    listing.source,
+                    listing.neighborhood,
+                    listing.property_type,
+                    listing.address,
+                    street,
+                    unit,
+                    listing.beds,
+                    listing.baths,
+                    listing.sqft,
+                    observed_at,
+                    observed_at,
+                    listing.price,
+                )
+            )
+            observation_rows.append(
+                (
+                    key,
+                    observed_at,
+                    listing.price,
+                    listing.neighborhood,
+                    listing.property_type,
+                )
+            )
+
+        with self._lock, self._conn:
+            self._conn.executemany(UPSERT_LISTING, listing_rows)
+            self._conn.executemany(UPSERT_OBSERVATION, observation_rows)
+
+        return len(listing_rows)
+
+    def query(self, sql, params=()):
+        with self._lock:
+            return pd.read_sql_query(sql, self._conn, params=params)
+
+    def latest_prices(self, neighborhood=None, property_type=None, source=None, since=None):
+        """Most recent price of each listing, optionally filtered
+
+        since is an ISO timestamp; listings last seen before it are left out.
+        """
+        conditions = []
+        params = []
+        for column, value in [
+            ("neighborhood", neighborhood),
+            ("property_type", property_type),
+            ("source", source),
+        ]:
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            conditions.append("last_seen >= ?")
+            params.append(since)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return self.query(
+            f"""
+            SELECT listing_key, source, neighborhood, property_type, address, unit,
+                   beds, baths, sqft, last_price AS price, first_seen, last_seen
+            FROM listings {where}
+            ORDER BY neighborhood, last_price
+            """,
+            params,
+        )
+
+    def listing_history(self, key):
+        """Every price observation of one listing, oldest first"""
+        return self.query(
+            """
+            SELECT observed_at, price, neighborhood, property_type
+            FROM price_observations
+            WHERE listing_key = ?
+            ORDER BY observed_at
+            """,
+            (key,),
+        )
+
+    def find_listings(self, address, source=None, property_type=None):
+        """Keys of the listings at an address (any spelling)
+
+        Covers every source and property type unless one is given.
+        """
+        street, unit = split_address(address)
+        sql = "SELECT listing_key FROM listings WHERE street = ? AND unit = ?"
+        params = [street, unit]
+        for column, value in [("source", source), ("property_type", property_type)]:
+            if value is not None:
+                sql += f" AND {column} = ?"
+                params.append(value)
+        return self.query(sql, params)["listing_key"].tolist()
+
+    def area_observations(self, neighborhood, property_type, since=None, until=None):
+        """Price observations in one neighborhood over a time range"""
+        sql = """
+            SELECT listing_key, observed_at, price
+            FROM price_observations
+            WHERE neighborhood = ? AND property_type = ?
+        """
+        params = [neighborhood, property_type]
+        if since is not None:
+            sql += " AND observed_at >= ?"
+            params.append(since)
+        if until is not None:
+            sql += " AND observed_at < ?"
+            params.append(until)
+        return self.query(sql + " ORDER BY observed_at", params)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
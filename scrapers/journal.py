@@ -0,0 +1,115 @@
+import os
+import json
+import time
+import threading
+
+
+class RunJournal:
+    """Append-only log of completed crawl units, used to resume an interrupted run
+
+    Every extracted page is written as one JSON line with its records, and a
+    (source, neighborhood, property_type) unit gets a "complete" line once its
+    pagination finishes. Reopening the same file restores that state.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._pages = {}
+        self._complete = set()
+        self._lock = threading.Lock()
+
+        if os.path.exists(path):
+            self._load()
+        elif os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    @classmethod
+    def for_run(cls, property_type="rent", directory="runs", prefix="crawl"):
+        """Open today's journal for a property type, so a same-day restart resumes
+
+        Runners whose records differ (index.py's display dicts, the crawler's
+        typed records) need their own prefix so they never share a file.
+        """
+        filename = f"{prefix}_{property_type}_{time.strftime('%Y%m%d')}.jsonl"
+        return cls(os.path.join(directory, filename))
+
+    def _load(self):
+        with open(self.path, "rb+") as f:
+            lines = f.readlines()
+            # A crash mid-write leaves a truncated last line; drop it so new
+            # entries don't get appended onto it
+            if lines and not lines[-1].endswith(b"\n"):
+                f.truncate(f.tell() - len(lines.pop()))
+
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+
+            key = (entry["source"], entry["neighborhood"], entry["property_type"])
+            if entry["type"] == "page":
+                self._pages.setdefault(key, {})[entry["page"]] = entry["records"]
+            elif entry["type"] == "complete":
+                self._complete.add(key)
+
+        completed_pages = sum(len(pages) for pages in self._pages.values())
+        print(
+            f"Resuming from {self.path}: {len(self._complete)} units complete, "
+            f"{completed_pages} pages recorded"
+        )
+
+    def _append(self, entry):
+        with open(self.path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def record_page(self, source, neighborhood, property_type, page, records):
+        """Persist one extracted page before moving on"""
+        key = (source, neighborhood, property_type)
+        with self._lock:
+            self._append(
+                {
+                    "type": "page",
+                    "source": source,
+                    "neighborhood": neighborhood,
+                    "property_type": property_type,
+                    "page": page,
+                    "records": records,
+                }
+            )
+            self._pages.setdefault(key, {})[page] = records
+
+    def mark_complete(self, source, neighborhood, property_type):
+        """Record that every page of a unit has been scraped"""
+        key = (source, neighborhood, property_type)
+        with self._lock:
+            self._append(
+                {
+                    "type": "complete",
+                    "source": source,
+                    "neighborhood": neighborhood,
+                    "property_type": property_type,
+                }
+            )
+            self._complete.add(key)
+
+    def is_complete(self, source, neighborhood, property_type):
+        return (source, neighborhood, property_type) in self._complete
+
+    def next_page(self, source, neighborhood, property_type):
+        """First page not yet recorded for a unit"""
+        pages = self._pages.get((source, neighborhood, property_type), {})
+        page = 1
+        while page in pages:
+            page += 1
+        return page
+
+    def records(self, source, neighborhood, property_type):
+        """All recorded records of a unit, in page order"""
+        pages = self._pages.get((source, neighborhood, property_type), {})
+        records = []
+        for page in sorted(pages):
+            records.extend(pages[page])
+        return records
@@ -0,0 +1,198 @@
+import re
+import sys
+import math
+
+import pandas as pd
+
+NUMBER_PATTERN = re.compile(r"\d[\d,]*(?:\.\d+)?")
+
+
+def parse_number(value):
+    """Read the first number in a display string ("$2,500 - $3,000" -> 2500.0)"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return None if math.isnan(value) else float(value)
+
+    match = NUMBER_PATTERN.search(value)
+    if not match:
+        return None
+    return float(match.group(0).replace(",", ""))
+
+
+def parse_beds(value):
+    """Read a bedroom count, with studios counted as 0 beds"""
+    if isinstance(value, str) and value.strip().lower().startswith("studio"):
+        return 0.0
+    return parse_number(value)
+
+
+def intern_text(value):
+    """Intern short repeated strings so every record shares one copy"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def format_number(value):
+    """Format a count without a trailing .0 ("2", "1.5")"""
+    return f"{value:g}"
+
+
+class Listing:
+    """One scraped listing with its numbers already parsed
+
+    Numeric fields are floats, or None when the card didn't show them. Extra
+    source-specific fields (e.g. Zillow's zpid) go in `extra`.
+    """
+
+    __slots__ = (
+        "source",
+        "neighborhood",
+        "property_type",
+        "address",
+        "price",
+        "beds",
+        "baths",
+        "sqft",
+        "extra",
+    )
+
+    # Column order of to_dict()/to_record(), matching the scrapers' old dicts
+    FIELDS = (
+        "source",
+        "neighborhood",
+        "price",
+        "address",
+        "beds",
+        "baths",
+        "sqft",
+        "property_type",
+    )
+
+    def __init__(
+        self,
+        source,
+        neighborhood,
+        property_type,
+        address=None,
+        price=None,
+        beds=None,
+        baths=None,
+        sqft=None,
+        extra=None,
+    ):
+        self.source = intern_text(source)
+        self.neighborhood = intern_text(neighborhood)
+        self.property_type = intern_text(property_type)
+        self.address = address
+        self.price = price
+        self.beds = beds
+        self.baths = baths
+        self.sqft = sqft
+        self.extra = extra
+
+    @classmethod
+    def from_display(
+        cls,
+        source,
+        neighborhood,
+        property_type,
+        price=None,
+        address=None,
+        beds=None,
+        baths=None,
+        sqft=None,
+        extra=None,
+    ):
+        """Build a listing from the strings shown on a card ("$3,450/mo", "2 bed")"""
+        return cls(
+            source,
+            neighborhood,
+            property_type,
+            address=address if address and address != "N/A" else None,
+            price=parse_number(price),
+            beds=parse_beds(beds),
+            baths=parse_number(baths),
+            sqft=parse_number(sqft),
+            extra=extra,
+        )
+
+    @classmethod
+    def from_record(cls, record):
+        """Rebuild a listing from to_record() or to_dict() output"""
+        extra = {k: v for k, v in record.items() if k not in cls.FIELDS}
+        return cls.from_display(
+            record["source"],
+            record["neighborhood"],
+            record["property_type"],
+            price=record.get("price"),
+            address=record.get("address"),
+            beds=record.get("beds"),
+            baths=record.get("baths"),
+            sqft=record.get("sqft"),
+            extra=extra or None,
+        )
+
+    def to_record(self):
+        """Export as a dict of typed values, e.g. for DataFrames or JSON"""
+        record = {
+            "source": self.source,
+            "neighborhood": self.neighborhood,
+            "price": self.price,
+            "address": self.address,
+            "beds": self.beds,
+            "baths": self.baths,
+            "sqft": self.sqft,
+            "property_type": self.property_type,
+        }
+        if self.extra:
+            record.update(self.extra)
+        return record
+
+    def to_dict(self):
+        """Export as display strings in one normalised format ("$3,450", "2 bed", "1 ba")
+
+        This is not the text the card showed: the source's own suffixes
+        ("/mo", "bath") aren't kept, and only the lower bound of a price
+        range survives parsing. Use to_record() for the typed values.
+        """
+        record = {
+            "source": self.source,
+            "neighborhood": self.neighborhood,
+            "price": f"${self.price:,.0f}" if self.price is not None else "N/A",
+            "address": self.address or "N/A",
+            "beds": self.format_beds(),
+            "baths": (
+                f"{format_number(self.baths)} ba" if self.baths is not None else "N/A"
+            ),
+            "sqft": f"{self.sqft:,.0f} sqft" if self.sqft is not None else "N/A",
+            "property_type": self.property_type,
+        }
+        if self.extra:
+            record.update(self.extra)
+        return record
+
+    def format_beds(self):
+        if self.beds is None:
+            return "N/A"
+        if self.beds == 0:
+            return "Studio"
+        return f"{format_number(self.beds)} bed"
+
+    def __repr__(self):
+        return (
+            f"Listing({self.source!r}, {self.neighborhood!r}, {self.address!r}, "
+            f"price={self.price}, beds={self.beds}, baths={self.baths}, sqft={self.sqft})"
+        )
+
+
+def listings_to_frame(listings):
+    """Build a typed DataFrame (numeric columns, categorical labels) from listings"""
+    df = pd.DataFrame([listing.to_record() for listing in listings])
+    if df.empty:
+        return pd.DataFrame(columns=list(Listing.FIELDS))
+
+    for column in ["price", "beds", "baths", "sqft"]:
+        df[column] = df[column].astype(float)
+    for column in ["source", "neighborhood", "property_type"]:
+        df[column] = df[column].astype("category")
+    return df
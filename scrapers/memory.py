@@ -0,0 +1,155 @@
+import os
+import json
+import time
+import threading
+
+# psutil is optional; without it the process tree is read from /proc
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def driver_pid(driver):
+    """PID of the chromedriver process, whose descendants are the browser's processes"""
+    try:
+        return driver.service.process.pid
+    except AttributeError:
+        return None
+
+
+def process_tree_pids(pid):
+    """PIDs of a process and all its descendants (empty if it is gone)"""
+    if pid is None:
+        return []
+    if psutil is not None:
+        try:
+            root = psutil.Process(pid)
+            return [pid] + [child.pid for child in root.children(recursive=True)]
+        except psutil.NoSuchProcess:
+            return []
+    if not os.path.isdir("/proc"):
+        return [pid]
+
+    children = {}
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name may contain spaces, so split after its closing paren
+        parent = int(stat.rsplit(")", 1)[1].split()[1])
+        children.setdefault(parent, []).append(int(name))
+
+    pids = []
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        pids.append(current)
+        pending.extend(children.get(current, []))
+    return pids
+
+
+def process_tree_rss(pid):
+    """Total resident memory in bytes of a process and all its descendants, or None"""
+    if pid is None:
+        return None
+    if psutil is not None:
+        return _psutil_tree_rss(pid)
+    if os.path.isdir("/proc"):
+        return _proc_tree_rss(pid)
+    return None
+
+
+def _psutil_tree_rss(pid):
+    try:
+        root = psutil.Process(pid)
+        processes = [root] + root.children(recursive=True)
+    except psutil.NoSuchProcess:
+        return None
+
+    total = 0
+    for process in processes:
+        try:
+            total += process.memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    return total
+
+
+def _proc_tree_rss(pid):
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    total = 0
+    found = False
+    for current in process_tree_pids(pid):
+        try:
+            with open(f"/proc/{current}/statm") as f:
+                total += int(f.read().split()[1]) * page_size
+            found = True
+        except OSError:
+            continue
+    return total if found else None
+
+
+class MemoryGovernor:
+    """Restart a scraper's browser between units once it gets too big or too old
+
+    Chrome's renderers grow over a long sweep; checking the RSS of the
+    driver's whole process tree before each neighborhood and swapping in a
+    fresh browser keeps memory flat. Recycles are kept in `events` and, with
+    a log_path, appended to a JSONL file.
+    """
+
+    def __init__(self, max_rss_mb=1500, max_pages=150, log_path=None):
+        self.max_rss_mb = max_rss_mb
+        self.max_pages = max_pages
+        self.log_path = log_path
+        self.events = []
+        self._lock = threading.Lock()
+
+    def driver_rss_mb(self, driver):
+        rss = process_tree_rss(driver_pid(driver))
+        return rss / (1024 * 1024) if rss is not None else None
+
+    def recycle_reason(self, scraper):
+        """Why the scraper's browser should be restarted, or None if it is fine"""
+        pages = getattr(scraper, "pages_loaded", 0)
+        if self.max_pages and pages >= self.max_pages:
+            return f"{pages} pages loaded"
+
+        rss_mb = self.driver_rss_mb(scraper.driver)
+        if self.max_rss_mb and rss_mb is not None and rss_mb >= self.max_rss_mb:
+            return f"browser using {rss_mb:.0f} MB"
+        return None
+
+    def check(self, scraper):
+        """Restart the scraper's browser if needed; returns True when it was restarted"""
+        if scraper.driver is None:
+            return False
+
+        reason = self.recycle_reason(scraper)
+        if reason is None:
+            return False
+
+        before_mb = self.driver_rss_mb(scraper.driver)
+        pages = getattr(scraper, "pages_loaded", 0)
+        print(f"{scraper.current_source} - Restarting browser: {reason}")
+        scraper.restart_driver()
+
+        event = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "source": scraper.current_source,
+            "neighborhood": scraper.current_neighborhood,
+            "reason": reason,
+            "rss_mb": before_mb,
+            "pages": pages,
+        }
+        with self._lock:
+            self.events.append(event)
+            if self.log_path:
+                with open(self.log_path, "a") as f:
+                    f.write(json.dumps(event) + "\n")
+        return True
@@ -0,0 +1,28 @@
+MANHATTAN_NEIGHBORHOODS = [
+    "upper-east-side",
+    "upper-west-side",
+    "midtown",
+    "chelsea",
+    "greenwich-village",
+    "east-village",
+    "harlem",
+    "tribeca",
+    "soho",
+]
+
+BROOKLYN_NEIGHBORHOODS = [
+    "williamsburg",
+    "park-slope",
+    "brooklyn-heights",
+    "dumbo",
+    "bushwick",
+    "bedford-stuyvesant",
+]
+
+
+def get_detailed_neighborhoods():
+    """Get more detailed NYC neighborhoods beyond the 5 boroughs"""
+    detailed_neighborhoods = []
+    detailed_neighborhoods.extend(MANHATTAN_NEIGHBORHOODS)
+    detailed_neighborhoods.extend(BROOKLYN_NEIGHBORHOODS)
+    return detailed_neighborhoods
@@ -0,0 +1,125 @@
+import os
+import gzip
+import json
+import time
+import hashlib
+import threading
+
+
+class PageCache:
+    """Content-addressed, gzip-compressed store of fetched page HTML
+
+    Page bodies live under objects/ named by their SHA-256, so identical pages
+    are stored once. index.jsonl maps each fetch (source, URL, fetch time and
+    the neighborhood/property type it was scraped for) to its body.
+    """
+
+    def __init__(self, directory="page_cache", ttl_days=30):
+        self.directory = directory
+        # Fetches older than this are dropped by prune()
+        self.ttl_days = ttl_days
+        self.index_path = os.path.join(directory, "index.jsonl")
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(directory, "objects"), exist_ok=True)
+
+    def object_path(self, digest):
+        return os.path.join(self.directory, "objects", digest[:2], f"{digest}.html.gz")
+
+    def store(
+        self,
+        source,
+        url,
+        html,
+        neighborhood=None,
+        property_type=None,
+        fetched_at=None,
+    ):
+        """Store a fetched page and return its content digest"""
+        body = html.encode("utf-8")
+        digest = hashlib.sha256(body).hexdigest()
+        path = self.object_path(digest)
+
+        entry = {
+            "source": source,
+            "url": url,
+            "fetched_at": fetched_at or time.time(),
+            "digest": digest,
+            "neighborhood": neighborhood,
+            "property_type": property_type,
+            "size": len(body),
+        }
+        # The body and its index line go in together, so a prune in between
+        # can't delete a body before it is referenced (or mid-write)
+        with self._lock:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Write under a temporary name so readers never see a partial file
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with gzip.open(tmp_path, "wb") as f:
+                    f.write(body)
+                os.replace(tmp_path, path)
+
+            with open(self.index_path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+
+        return digest
+
+    def entries(self, source=None, since=None, until=None):
+        """Yield index entries, oldest first, optionally filtered by source and fetch time"""
+        if not os.path.exists(self.index_path):
+            return
+
+        with open(self.index_path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if source is not None and entry["source"] != source:
+                    continue
+                if since is not None and entry["fetched_at"] < since:
+                    continue
+                if until is not None and entry["fetched_at"] >= until:
+                    continue
+                yield entry
+
+    def load(self, entry):
+        """Return the HTML of an index entry"""
+        with gzip.open(self.object_path(entry["digest"]), "rb") as f:
+            return f.read().decode("utf-8")
+
+    def get(self, source, url, max_age=None):
+        """Return the most recently cached HTML of a URL, or None"""
+        since = time.time() - max_age if max_age is not None else None
+        latest = None
+        for entry in self.entries(source=source, since=since):
+            if entry["url"] == url:
+                latest = entry
+        return self.load(latest) if latest else None
+
+    def prune(self):
+        """Drop fetches older than the TTL and delete bodies no fetch refers to"""
+        cutoff = time.time() - self.ttl_days * 24 * 60 * 60
+
+        with self._lock:
+            kept = [e for e in self.entries() if e["fetched_at"] >= cutoff]
+            tmp_path = f"{self.index_path}.tmp"
+            with open(tmp_path, "w") as f:
+                for entry in kept:
+                    f.write(json.dumps(entry) + "\n")
+            os.replace(tmp_path, self.index_path)
+
+            referenced = {entry["digest"] for entry in kept}
+            removed = 0
+            objects_dir = os.path.join(self.directory, "objects")
+            for prefix in os.listdir(objects_dir):
+                for name in os.listdir(os.path.join(objects_dir, prefix)):
+                    # Leftovers of an interrupted write are not pages
+                    if name.endswith(".tmp"):
+                        continue
+                    if name.split(".")[0] not in referenced:
+                        os.remove(os.path.join(objects_dir, prefix, name))
+                        removed += 1
+
+        print(f"Pruned page cache: kept {len(kept)} fetches, removed {removed} pages")
+        return removed
@@ -0,0 +1,79 @@
+import time
+import threading
+from urllib.parse import urlparse
+
+# (requests per second, burst size) for each crawled domain
+DEFAULT_DOMAIN_RATES = {
+    "zillow.com": (0.25, 2),
+    "streeteasy.com": (0.3, 2),
+    "apartments.com": (0.5, 3),
+}
+
+# Used for any domain not listed above
+FALLBACK_RATE = (0.5, 1)
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing `rate` acquisitions per second"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it; returns seconds waited"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+class RateLimiter:
+    """One token bucket per domain, shared by every scraper navigating to it"""
+
+    def __init__(self, domain_rates=None):
+        self.domain_rates = dict(DEFAULT_DOMAIN_RATES)
+        self.domain_rates.update(domain_rates or {})
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def get_domain(self, url):
+        """Map a URL to the configured domain it belongs to"""
+        host = urlparse(url).hostname or ""
+        for domain in self.domain_rates:
+            if host == domain or host.endswith("." + domain):
+                return domain
+        return host
+
+    def bucket(self, domain):
+        with self._lock:
+            if domain not in self._buckets:
+                rate, capacity = self.domain_rates.get(domain, FALLBACK_RATE)
+                self._buckets[domain] = TokenBucket(rate, capacity)
+            return self._buckets[domain]
+
+    def acquire(self, url):
+        """Wait for the URL's domain to allow another request"""
+        domain = self.get_domain(url)
+        waited = self.bucket(domain).acquire()
+        if waited >= 1:
+            print(f"Rate limit: waited {waited:.1f}s for {domain}")
+        return waited
+
+
+# Shared by scrapers that aren't given their own limiter, so every scraper in
+# the process stays inside the same per-domain budget
+default_rate_limiter = RateLimiter()
@@ -0,0 +1,71 @@
+import time
+
+# Scroll one step, then resolve as soon as more cards match the selector (watched
+# with a MutationObserver) or the step timeout runs out
+SCROLL_AND_WAIT_SCRIPT = """
+const [selector, previous, timeoutMs, increment] = arguments;
+const done = arguments[arguments.length - 1];
+const count = () => document.querySelectorAll(selector).length;
+const atBottom = () =>
+    window.scrollY + window.innerHeight >= document.body.scrollHeight - 2;
+const finish = () => done({count: count(), atBottom: atBottom()});
+
+window.scrollBy(0, increment);
+if (count() > previous) {
+    finish();
+    return;
+}
+
+let timer = null;
+const observer = new MutationObserver(() => {
+    if (count() > previous) {
+        observer.disconnect();
+        clearTimeout(timer);
+        finish();
+    }
+});
+observer.observe(document.body, {childList: true, subtree: true});
+timer = setTimeout(() => {
+    observer.disconnect();
+    finish();
+}, timeoutMs);
+"""
+
+
+def adaptive_scroll(
+    driver,
+    card_selector,
+    page_size=None,
+    scroll_increment=800,
+    step_timeout=1.5,
+    max_time=15,
+):
+    """Scroll until the listing-card count stops growing, then return the count
+
+    Each step waits only until new cards render rather than for a fixed sleep.
+    Scrolling stops once the page bottom is reached without new cards, once
+    page_size cards are present, or after max_time seconds.
+    """
+    deadline = time.monotonic() + max_time
+    count = driver.execute_script(
+        "return document.querySelectorAll(arguments[0]).length", card_selector
+    )
+
+    while time.monotonic() < deadline:
+        if page_size and count >= page_size:
+            break
+
+        state = driver.execute_async_script(
+            SCROLL_AND_WAIT_SCRIPT,
+            card_selector,
+            count,
+            int(step_timeout * 1000),
+            scroll_increment,
+        )
+        grew = state["count"] > count
+        count = state["count"]
+
+        if not grew and state["atBottom"]:
+            break
+
+    return count
@@ -0,0 +1,398 @@
+"""Local HTTP/JSON service over the scraped data
+
+    python -m scrapers.service --port 8765
+
+    GET  /stats?property_type=rent&by=neighborhood,beds&neighborhood=Chelsea&since=2026-09-01
+    GET  /listings?neighborhood=Chelsea&min_price=2000&max_price=3500&beds=1
+    GET  /history?address=22 W 15th St Apt 4A   (or ?key=<listing key>)
+    GET  /health
+    POST /invalidate   {"units": [["zillow", "Chelsea"], ...]}, or {} to re-check now
+
+Responses are kept in an LRU cache. Each entry is tagged with the sources and
+neighborhoods it covers, and is dropped only when a new run lands for one of
+them.
+"""
+
+import os
+import json
+import time
+import argparse
+import threading
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from scrapers.cube import DIMENSIONS, PriceCube, week_of
+from scrapers.history import ListingHistory
+from scrapers.stats import calculate_neighborhood_stats
+
+
+class ResultCache:
+    """LRU cache of encoded query results, invalidated per source and neighborhood"""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # Bumped by every invalidation, so results computed before one can be
+        # told apart from those computed after
+        self.generation = 0
+        # key -> (body, sources, neighborhoods); None in a scope means "any"
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, body, sources=None, neighborhoods=None, generation=None):
+        """Cache a result, unless an invalidation happened since `generation` was read"""
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = (body, sources, neighborhoods)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, units):
+        """Drop entries covering any of the (source, neighborhood) units; returns how many"""
+        units = set(units)
+        if not units:
+            return 0
+        with self._lock:
+            self.generation += 1
+            stale = [
+                key
+                for key, (_, sources, neighborhoods) in self._entries.items()
+                if any(
+                    (sources is None or source in sources)
+                    and (neighborhoods is None or neighborhood in neighborhoods)
+                    for source, neighborhood in units
+                )
+            ]
+            for key in stale:
+                del self._entries[key]
+        return len(stale)
+
+    def info(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+def frame_to_json(df):
+    # to_json writes NaN as null, which json.dumps wouldn't
+    return df.to_json(orient="records", date_format="iso").encode()
+
+
+class StatsService:
+    """Neighborhood stats, listing search and price history, with cached results
+
+    Stats come from a PriceCube when there is one, otherwise from the latest
+    prices in the ListingHistory. A background thread checks every
+    poll_interval seconds for units changed by new runs: listings recorded in
+    the history since the last check, and cube cells that changed. Only
+    cached results covering those units are dropped. The cube file at
+    cube_path (the cube's own path by default) is watched even before it
+    exists, so a service started ahead of the first run picks it up.
+    """
+
+    def __init__(
+        self, history=None, cube=None, cache_size=512, poll_interval=30, cube_path=None
+    ):
+        self.history = history
+        self.cube = cube
+        self.cube_path = cube_path or (cube.path if cube is not None else None)
+        self.cache = ResultCache(cache_size)
+        self.poll_interval = poll_interval
+        self._last_observation = self._max_observation()
+        self._cube_mtime = self._cube_file_mtime()
+        self._stop = threading.Event()
+
+    # Change detection
+
+    def _max_observation(self):
+        if self.history is None:
+            return None
+        # Observations are only ever inserted, so the top rowid moves on every run
+        top = self.history.query("SELECT max(rowid) AS id FROM price_observations")["id"][0]
+        # As a plain int: sqlite3 would bind a numpy integer as a blob
+        return None if pd.isna(top) else int(top)
+
+    def _cube_file_mtime(self):
+        if not self.cube_path or not os.path.exists(self.cube_path):
+            return None
+        return os.path.getmtime(self.cube_path)
+
+    def changed_units(self):
+        """(source, neighborhood) units that new runs touched since the last call"""
+        units = set()
+
+        observation = self._max_observation()
+        if observation != self._last_observation:
+            # Only the rows added since the last check are read; the source
+            # is the first part of the listing key (source|property_type|...)
+            changed = self.history.query(
+                """
+                SELECT DISTINCT substr(listing_key, 1, instr(listing_key, '|') - 1)
+                       AS source, neighborhood
+                FROM price_observations
+                WHERE rowid > ?
+                """,
+                (self._last_observation or 0,),
+            )
+            units.update(zip(changed["source"], changed["neighborhood"]))
+            self._last_observation = observation
+
+        mtime = self._cube_file_mtime()
+        # A cube file that went away leaves the loaded cube in place
+        if mtime is not None and mtime != self._cube_mtime:
+            fresh = PriceCube(self.cube_path)
+            cells = self.cube.cells if self.cube is not None else {}
+            for key in cells.keys() | fresh.cells.keys():
+                old, new = cells.get(key), fresh.cells.get(key)
+                if old is None or new is None or old.to_row() != new.to_row():
+                    units.add((key[DIMENSIONS.index("source")], key[0]))
+            self.cube = fresh
+            self._cube_mtime = mtime
+        return units
+
+    def refresh(self):
+        """Drop cached results for units changed since the last refresh"""
+        units = self.changed_units()
+        dropped = self.cache.invalidate(units)
+        if units:
+            print(f"New data for {len(units)} units, dropped {dropped} cached results")
+        return units
+
+    def _poll(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error checking for new runs: {e}")
+
+    # Queries
+
+    def _require_history(self, endpoint):
+        if self.history is None:
+            raise ValueError(f"{endpoint} needs a listing history, and this service has none")
+
+    def stats(self, params):
+        """Price stats grouped by the `by` dimensions, from the cube or the history
+
+        Rent and sale prices are only comparable apart, so one of
+        property_type or by=...,property_type is required.
+        """
+        by = tuple(params.get("by", ["neighborhood"])[0].split(","))
+        property_type = params.get("property_type", [None])[0]
+        neighborhoods = params.get("neighborhood")
+        sources = params.get("source")
+        if not property_type and "property_type" not in by:
+            raise ValueError("stats need a property_type, or property_type in by")
+
+        if self.cube is not None:
+            unknown = [dimension for dimension in by if dimension not in DIMENSIONS]
+            if unknown:
+                raise ValueError(f"Can't group stats by {unknown}; use {list(DIMENSIONS)}")
+            filters = {}
+            if property_type:
+                filters["property_type"] = property_type
+            if neighborhoods:
+                filters["neighborhood"] = neighborhoods
+            if sources:
+                filters["source"] = sources
+            if "beds" in params:
+                filters["beds"] = [float(beds) for beds in params["beds"]]
+            if "since" in params:
+                first = week_of(params["since"][0])
+                position = DIMENSIONS.index("week")
+                filters["week"] = [
+                    week
+                    for week in {key[position] for key in self.cube.cells}
+                    if week >= first
+                ]
+            df = self.cube.frame(by, **filters).reset_index()
+        else:
+            if by != ("neighborhood",):
+                raise ValueError("Without a price cube stats can only be grouped by neighborhood")
+            self._require_history("stats")
+            df = self.history.latest_prices(
+                property_type=property_type,
+                since=params.get("since", [None])[0],
+            )
+            if neighborhoods:
+                df = df[df["neighborhood"].isin(neighborhoods)]
+            if sources:
+                df = df[df["source"].isin(sources)]
+            if "beds" in params:
+                df = df[df["beds"].isin([float(beds) for beds in params["beds"]])]
+            df = calculate_neighborhood_stats(df).reset_index()
+        return frame_to_json(df), sources, neighborhoods
+
+    def listings(self, params):
+        """Current listings matching neighborhood, source, price range and beds"""
+        self._require_history("listings")
+        neighborhoods = params.get("neighborhood")
+        sources = params.get("source")
+        df = self.history.latest_prices(
+            property_type=params.get("property_type", [None])[0],
+            since=params.get("since", [None])[0],
+        )
+        if neighborhoods:
+            df = df[df["neighborhood"].isin(neighborhoods)]
+        if sources:
+            df = df[df["source"].isin(sources)]
+        if "min_price" in params:
+            df = df[df["price"] >= float(params["min_price"][0])]
+        if "max_price" in params:
+            df = df[df["price"] <= float(params["max_price"][0])]
+        if "beds" in params:
+            df = df[df["beds"].isin([float(beds) for beds in params["beds"]])]
+        limit = int(params.get("limit", ["500"])[0])
+        return frame_to_json(df.head(limit)), sources, neighborhoods
+
+    def price_history(self, params):
+        """Price observations of one listing (?key=) or every listing at an address"""
+        self._require_history("history")
+        source = params.get("source", [None])[0]
+        property_type = params.get("property_type", [None])[0]
+        if "key" in params:
+            keys = params["key"]
+        elif "address" in params:
+            keys = self.history.find_listings(params["address"][0], source, property_type)
+        else:
+            raise ValueError("history needs a key or an address")
+
+        frames = []
+        for key in keys:
+            observations = self.history.listing_history(key)
+            observations.insert(0, "listing_key", key)
+            frames.append(observations)
+        df = pd.concat(frames) if frames else pd.DataFrame()
+        # Which neighborhood an address is in isn't known up front
+        sources = {key.split("|", 1)[0] for key in keys} or None
+        return frame_to_json(df), sources, None
+
+    ROUTES = {"/stats": "stats", "/listings": "listings", "/history": "price_history"}
+
+    def handle(self, path, params):
+        """Encoded JSON for a GET request, from the cache when possible"""
+        if path == "/health":
+            return json.dumps(self.cache.info()).encode()
+        if path not in self.ROUTES:
+            raise KeyError(path)
+
+        key = (path, tuple(sorted((name, tuple(values)) for name, values in params.items())))
+        body = self.cache.get(key)
+        if body is None:
+            # A result computed while a refresh ran may predate the new data
+            generation = self.cache.generation
+            body, sources, neighborhoods = getattr(self, self.ROUTES[path])(params)
+            self.cache.put(
+                key,
+                body,
+                set(sources) if sources else None,
+                set(neighborhoods) if neighborhoods else None,
+                generation=generation,
+            )
+        return body
+
+    def serve(self, host="127.0.0.1", port=8765):
+        """Serve requests until interrupted"""
+        server = ThreadingHTTPServer((host, port), make_handler(self))
+        poller = threading.Thread(target=self._poll, daemon=True)
+        poller.start()
+        print(f"Serving stats on http://{host}:{port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._stop.set()
+            server.server_close()
+
+
+def make_handler(service):
+    class StatsHandler(BaseHTTPRequestHandler):
+        def send_json(self, status, body):
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def send_error_json(self, status, message):
+            self.send_json(status, json.dumps({"error": message}).encode())
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            started = time.perf_counter()
+            try:
+                body = service.handle(url.path, parse_qs(url.query))
+            except KeyError:
+                self.send_error_json(404, f"Unknown endpoint: {url.path}")
+                return
+            except (ValueError, TypeError) as e:
+                self.send_error_json(400, str(e))
+                return
+            except Exception as e:
+                print(f"Error serving {self.path}: {e}")
+                self.send_error_json(500, str(e))
+                return
+            self.send_json(200, body)
+            self.log_message(
+                "%s served in %.1f ms", url.path, (time.perf_counter() - started) * 1000
+            )
+
+        def do_POST(self):
+            if urlparse(self.path).path != "/invalidate":
+                self.send_error_json(404, f"Unknown endpoint: {self.path}")
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError as e:
+                self.send_error_json(400, str(e))
+                return
+
+            if request.get("units"):
+                units = {tuple(unit) for unit in request["units"]}
+                dropped = service.cache.invalidate(units)
+            else:
+                units = service.refresh()
+                dropped = None
+            self.send_json(
+                200,
+                json.dumps({"units": [list(unit) for unit in units], "dropped": dropped}).encode(),
+            )
+
+    return StatsHandler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve scraped listing stats over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--history", default="listing_history.db")
+    parser.add_argument("--cube", default="price_cube.json.gz")
+    parser.add_argument("--cache-size", type=int, default=512)
+    parser.add_argument("--poll-interval", type=float, default=30)
+    args = parser.parse_args()
+
+    service = StatsService(
+        history=ListingHistory(args.history),
+        cube=PriceCube(args.cube) if os.path.exists(args.cube) else None,
+        cache_size=args.cache_size,
+        poll_interval=args.poll_interval,
+        cube_path=args.cube,
+    )
+    service.serve(args.host, args.port)
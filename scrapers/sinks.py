@@ -0,0 +1,133 @@
+import csv
+import time
+
+from scrapers.listing import Listing
+from scrapers.stats import NeighborhoodStats
+from scrapers.storage import listing_schema, listings_to_table, pa
+
+# Source-specific extras written as their own CSV columns when present
+EXTRA_COLUMNS = ("zpid", "listing_id", "latitude", "longitude")
+
+
+class ListingSink:
+    """Consumer of streamed listing batches (one results page at a time)"""
+
+    def write(self, listings):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class CsvSink(ListingSink):
+    """Append each batch to a CSV file as it arrives"""
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self._file = open(path, "w", newline="")
+        self._writer = csv.DictWriter(
+            self._file,
+            fieldnames=list(Listing.FIELDS) + list(EXTRA_COLUMNS),
+            extrasaction="ignore",
+        )
+        self._writer.writeheader()
+
+    def write(self, listings):
+        self._writer.writerows(listing.to_record() for listing in listings)
+        # Flush per page so readers see rows while the crawl is still going
+        self._file.flush()
+        self.rows += len(listings)
+
+    def close(self):
+        self._file.close()
+        print(f"Saved {self.rows} listings to {self.path}")
+
+
+class ParquetSink(ListingSink):
+    """Write each batch as a row group of one Parquet file"""
+
+    def __init__(self, path, run_date=None):
+        if pa is None:
+            raise ImportError("ParquetSink requires pyarrow (pip install pyarrow)")
+        import pyarrow.parquet as pq
+
+        self.path = path
+        self.run_date = run_date or time.strftime("%Y-%m-%d")
+        self.rows = 0
+        schema = listing_schema()
+        for field in ["date", "source", "neighborhood"]:
+            schema = schema.append(pa.field(field, pa.string()))
+        self._writer = pq.ParquetWriter(path, schema)
+
+    def write(self, listings):
+        table = listings_to_table(listings, self.run_date)
+        self._writer.write_table(table.select(self._writer.schema.names))
+        self.rows += len(listings)
+
+    def close(self):
+        self._writer.close()
+        print(f"Saved {self.rows} listings to {self.path}")
+
+
+class DatasetSink(ListingSink):
+    """Append batches to a ListingDataset, a few thousand rows per write
+
+    Writing every page separately would leave one tiny file per page and
+    partition, so rows are buffered up to batch_rows first.
+    """
+
+    def __init__(self, dataset, batch_rows=5000, run_date=None):
+        self.dataset = dataset
+        self.batch_rows = batch_rows
+        self.run_date = run_date
+        self._buffer = []
+
+    def write(self, listings):
+        self._buffer.extend(listings)
+        if len(self._buffer) >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self.dataset.write(self._buffer, run_date=self.run_date)
+            self._buffer = []
+
+    def close(self):
+        self.flush()
+
+
+class HistorySink(ListingSink):
+    """Record batches in a ListingHistory, all under the run's start time"""
+
+    def __init__(self, history, observed_at=None):
+        self.history = history
+        self.observed_at = observed_at or time.strftime("%Y-%m-%dT%H:%M:%S")
+
+    def write(self, listings):
+        self.history.record(listings, observed_at=self.observed_at)
+
+
+class StatsSink(ListingSink):
+    """Per-neighborhood price and price-per-sqft stats, kept up to date as pages arrive
+
+    Pass `stats` to group differently or to keep adding to stats loaded from
+    earlier runs; with a path they are saved on close for the next run.
+    """
+
+    def __init__(self, stats=None, path=None, run_date=None):
+        self.stats = stats if stats is not None else NeighborhoodStats()
+        self.path = path
+        self.run_date = run_date or time.strftime("%Y-%m-%d")
+
+    def write(self, listings):
+        self.stats.add_all(listings, day=self.run_date)
+
+    def frame(self, days=None):
+        """Current stats, one row per group, in calculate_neighborhood_stats' column names"""
+        return self.stats.frame(days=days)
+
+    def close(self):
+        if self.path:
+            self.stats.save(self.path)
+            print(f"Saved stats to {self.path}")
@@ -0,0 +1,76 @@
+import math
+
+
+class QuantileSketch:
+    """Approximate quantiles of a stream with a bounded relative error
+
+    Values are counted in log-scale buckets (as in DDSketch), so any quantile
+    is within `relative_accuracy` of the true value. Unlike P² or a t-digest,
+    merging two sketches is exact: the bucket counts just add up. That lets
+    parallel workers and separate days be combined freely. Prices from $500 to
+    $50M take a few hundred buckets at 1% accuracy.
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        # Zero and negative values can't be log-bucketed; they count as 0
+        self.zeros = 0
+        self.count = 0
+
+    def add(self, value, count=1):
+        if value > 0:
+            index = math.ceil(math.log(value) / self._log_gamma)
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        else:
+            self.zeros += count
+        self.count += count
+
+    def merge(self, other):
+        """Add another sketch's counts to this one"""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError(
+                "Can't merge sketches with different accuracies "
+                f"({self.relative_accuracy} and {other.relative_accuracy})"
+            )
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+        return self
+
+    def quantile(self, q):
+        """The q-th quantile (0 <= q <= 1), or None for an empty sketch"""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                # Midpoint of the bucket (gamma^(i-1), gamma^i] in relative terms
+                return 2 * self.gamma**index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+    def median(self):
+        return self.quantile(0.5)
+
+    def to_dict(self):
+        # JSON object keys must be strings
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "zeros": self.zeros,
+            "buckets": {str(index): count for index, count in self.buckets.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["relative_accuracy"])
+        sketch.zeros = data["zeros"]
+        sketch.buckets = {int(index): count for index, count in data["buckets"].items()}
+        sketch.count = sketch.zeros + sum(sketch.buckets.values())
+        return sketch
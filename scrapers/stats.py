@@ -0,0 +1,284 @@
+import os
+import gzip
+import json
+import time
+import datetime
+
+import pandas as pd
+
+from scrapers.sketch import QuantileSketch
+
+# Everything stripped from a display price ("$3,450/mo", "$2,000+") or
+# square footage ("1,200 sqft") before it is read as a number
+PRICE_NOISE = r"[$,+]|/mo"
+SQFT_NOISE = r"sqft|,"
+
+STAT_FUNCTIONS = ["mean", "median", "min", "max", "count"]
+
+
+def parse_numeric(series, noise):
+    """Convert display strings to floats, parsing each distinct string only once"""
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(float)
+
+    # Listing columns repeat the same few thousand strings, so clean the
+    # distinct values and broadcast them back with the factorized codes
+    codes, uniques = pd.factorize(series)
+    cleaned = pd.Series(uniques, dtype=object).astype(str)
+    cleaned = cleaned.str.replace(noise, "", regex=True).str.strip()
+    values = pd.to_numeric(cleaned, errors="coerce").to_numpy(dtype=float)
+
+    parsed = pd.Series(float("nan"), index=series.index)
+    known = codes >= 0
+    parsed[known] = values[codes[known]]
+    return parsed
+
+
+def grouped_mode(df, by, column):
+    """Most common non-null value of column per group, ties going to the first seen"""
+    counts = (
+        df.groupby([by, column], sort=False, observed=True)
+        .size()
+        .reset_index(name="count")
+    )
+    # idxmax keeps the first row with the highest count in each group
+    first_max = counts.groupby(by, sort=False, observed=True)["count"].idxmax()
+    return counts.loc[first_max].set_index(by)[column]
+
+
+def calculate_neighborhood_stats(df):
+    """Calculate average prices and other stats by neighborhood
+
+    Adds price_clean, sqft_clean and price_per_sqft to df and returns one row
+    per neighborhood with the flattened columns price_clean_{stat},
+    price_per_sqft_{stat}, beds_<lambda> and baths_<lambda> (the modes).
+    """
+    df["price_clean"] = parse_numeric(df["price"], PRICE_NOISE)
+    df["sqft_clean"] = parse_numeric(df["sqft"], SQFT_NOISE)
+
+    # Price per sqft only where the area is known and positive
+    df["price_per_sqft"] = df["price_clean"] / df["sqft_clean"].where(
+        df["sqft_clean"] > 0
+    )
+
+    neighborhood_stats = df.groupby("neighborhood", observed=True)[
+        ["price_clean", "price_per_sqft"]
+    ].agg(STAT_FUNCTIONS)
+
+    # Flatten the column hierarchy
+    neighborhood_stats.columns = [
+        "_".join(col).strip() for col in neighborhood_stats.columns.values
+    ]
+
+    for column in ["beds", "baths"]:
+        modes = grouped_mode(df, "neighborhood", column)
+        neighborhood_stats[f"{column}_<lambda>"] = modes.reindex(
+            neighborhood_stats.index
+        )
+
+    return neighborhood_stats
+
+
+class RunningStats:
+    """Count, sum, min, max and approximate quantiles of a stream of values"""
+
+    __slots__ = ("count", "total", "min", "max", "sketch")
+
+    def __init__(self, relative_accuracy=0.01):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.sketch = QuantileSketch(relative_accuracy)
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.sketch.add(value)
+
+    def merge(self, other):
+        self.count += other.count
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+        self.sketch.merge(other.sketch)
+        return self
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def quantile(self, q):
+        return self.sketch.quantile(q)
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "total": self.total,
+            "min": self.min,
+            "max": self.max,
+            "sketch": self.sketch.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.count = data["count"]
+        stats.total = data["total"]
+        stats.min = data["min"]
+        stats.max = data["max"]
+        stats.sketch = QuantileSketch.from_dict(data["sketch"])
+        return stats
+
+
+class NeighborhoodStats:
+    """Incremental price and price-per-sqft stats, grouped like calculate_neighborhood_stats
+
+    Listings are added as they are scraped, into one bucket per day and group
+    (by neighborhood by default, or any of neighborhood/beds/source/
+    property_type). Buckets merge exactly, so stats from parallel workers or
+    earlier runs combine without the raw rows, and a rolling window is just
+    the merge of its days. Medians and other quantiles are approximate, within
+    `relative_accuracy` of the true value.
+    """
+
+    def __init__(self, by=("neighborhood",), relative_accuracy=0.01):
+        self.by = tuple(by)
+        self.relative_accuracy = relative_accuracy
+        # {day: {group: (price stats, price per sqft stats)}}
+        self.days = {}
+
+    def group(self, listing):
+        return tuple(getattr(listing, field) for field in self.by)
+
+    def _bucket(self, day, group):
+        groups = self.days.setdefault(day, {})
+        bucket = groups.get(group)
+        if bucket is None:
+            bucket = groups[group] = (
+                RunningStats(self.relative_accuracy),
+                RunningStats(self.relative_accuracy),
+            )
+        return bucket
+
+    def add(self, listing, day=None):
+        if listing.price is None:
+            return
+        price, per_sqft = self._bucket(
+            day or time.strftime("%Y-%m-%d"), self.group(listing)
+        )
+        price.add(listing.price)
+        if listing.sqft:
+            per_sqft.add(listing.price / listing.sqft)
+
+    def add_all(self, listings, day=None):
+        day = day or time.strftime("%Y-%m-%d")
+        for listing in listings:
+            self.add(listing, day)
+
+    def merge(self, other):
+        """Fold in stats gathered elsewhere (another worker, an earlier run)"""
+        if other.by != self.by:
+            raise ValueError(f"Can't merge stats grouped by {other.by} into {self.by}")
+        for day, groups in other.days.items():
+            for group, (price, per_sqft) in groups.items():
+                own_price, own_per_sqft = self._bucket(day, group)
+                own_price.merge(price)
+                own_per_sqft.merge(per_sqft)
+        return self
+
+    def window(self, days=None, until=None):
+        """Each group's stats merged over the `days` days up to `until` (all days by default)"""
+        first = None
+        if days is not None:
+            end = datetime.date.fromisoformat(until) if until else datetime.date.today()
+            first = (end - datetime.timedelta(days=days - 1)).isoformat()
+            until = end.isoformat()
+
+        merged = {}
+        for day, groups in self.days.items():
+            if (first and day < first) or (until and day > until):
+                continue
+            for group, (price, per_sqft) in groups.items():
+                if group not in merged:
+                    merged[group] = (
+                        RunningStats(self.relative_accuracy),
+                        RunningStats(self.relative_accuracy),
+                    )
+                merged[group][0].merge(price)
+                merged[group][1].merge(per_sqft)
+        return merged
+
+    def prune(self, keep_days, until=None):
+        """Drop day buckets older than the last keep_days days"""
+        end = datetime.date.fromisoformat(until) if until else datetime.date.today()
+        first = (end - datetime.timedelta(days=keep_days - 1)).isoformat()
+        for day in [day for day in self.days if day < first]:
+            del self.days[day]
+
+    def frame(self, days=None, until=None, quantiles=()):
+        """Stats in calculate_neighborhood_stats' column names, one row per group
+
+        Extra quantiles come out as e.g. price_clean_p90 for 0.9.
+        """
+        rows = {}
+        for group, (price, per_sqft) in self.window(days, until).items():
+            row = {}
+            for prefix, stats in [("price_clean", price), ("price_per_sqft", per_sqft)]:
+                row[f"{prefix}_mean"] = stats.mean()
+                row[f"{prefix}_median"] = stats.quantile(0.5)
+                row[f"{prefix}_min"] = stats.min
+                row[f"{prefix}_max"] = stats.max
+                row[f"{prefix}_count"] = stats.count
+                for q in quantiles:
+                    row[f"{prefix}_p{q * 100:g}"] = stats.quantile(q)
+            rows[group if len(self.by) > 1 else group[0]] = row
+
+        df = pd.DataFrame.from_dict(rows, orient="index")
+        if len(self.by) > 1 and len(df):
+            df.index = pd.MultiIndex.from_tuples(df.index, names=self.by)
+        else:
+            df.index.name = self.by[0] if len(self.by) == 1 else None
+        return df
+
+    def to_dict(self):
+        return {
+            "by": list(self.by),
+            "relative_accuracy": self.relative_accuracy,
+            "days": {
+                day: [
+                    [list(group), price.to_dict(), per_sqft.to_dict()]
+                    for group, (price, per_sqft) in groups.items()
+                ]
+                for day, groups in self.days.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls(data["by"], data["relative_accuracy"])
+        for day, groups in data["days"].items():
+            stats.days[day] = {
+                tuple(group): (RunningStats.from_dict(price), RunningStats.from_dict(per_sqft))
+                for group, price, per_sqft in groups
+            }
+        return stats
+
+    def save(self, path):
+        """Write the stats as gzipped JSON, replacing the file atomically"""
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, "wt") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, by=("neighborhood",), relative_accuracy=0.01):
+        """Stats saved by an earlier run, or empty ones if there are none yet"""
+        try:
+            with gzip.open(path, "rt") as f:
+                return cls.from_dict(json.load(f))
+        except FileNotFoundError:
+            return cls(by, relative_accuracy)
@@ -0,0 +1,136 @@
+import time
+import uuid
+
+import pandas as pd
+
+# pyarrow is only needed for the Parquet dataset
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+except ImportError:
+    pa = None
+
+# Directory levels of the dataset, outermost first
+PARTITION_FIELDS = ["date", "source", "neighborhood"]
+
+
+def listing_schema():
+    """Column types of the stored listings (partition columns excluded)"""
+    labels = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema(
+        [
+            ("property_type", labels),
+            ("address", pa.string()),
+            ("price", pa.float64()),
+            ("beds", pa.float32()),
+            ("baths", pa.float32()),
+            ("sqft", pa.float32()),
+            ("zpid", pa.string()),
+            ("listing_id", pa.string()),
+            ("latitude", pa.float64()),
+            ("longitude", pa.float64()),
+        ]
+    )
+
+
+def partition_schema():
+    return pa.schema([(field, pa.string()) for field in PARTITION_FIELDS])
+
+
+def listings_to_table(listings, run_date):
+    """Convert Listings to an Arrow table with the dataset's typed columns"""
+    records = [listing.to_record() for listing in listings]
+    schema = listing_schema()
+
+    columns = {}
+    for field in schema:
+        values = [record.get(field.name) for record in records]
+        if pa.types.is_string(field.type):
+            values = [None if v is None else str(v) for v in values]
+        columns[field.name] = pa.array(values, type=field.type)
+
+    columns["date"] = pa.array([run_date] * len(records), type=pa.string())
+    columns["source"] = pa.array([r["source"] for r in records], type=pa.string())
+    columns["neighborhood"] = pa.array(
+        [r["neighborhood"] for r in records], type=pa.string()
+    )
+    return pa.table(columns)
+
+
+class ListingDataset:
+    """Parquet dataset of every run's listings, partitioned by date/source/neighborhood
+
+    Each write adds new files under date=YYYY-MM-DD/source=.../neighborhood=...,
+    so same-day runs are appended instead of overwriting each other, and
+    queries on those fields only open the matching directories.
+    """
+
+    def __init__(self, root="listings_dataset"):
+        if pa is None:
+            raise ImportError("ListingDataset requires pyarrow (pip install pyarrow)")
+        self.root = root
+
+    def write(self, listings, run_date=None):
+        """Append one run's listings to the dataset; returns the number of rows written"""
+        run_date = run_date or time.strftime("%Y-%m-%d")
+        table = listings_to_table(listings, run_date)
+        if table.num_rows == 0:
+            return 0
+
+        # A unique file prefix per write keeps earlier runs' files in place
+        run_id = f"{time.strftime('%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        ds.write_dataset(
+            table,
+            self.root,
+            format="parquet",
+            partitioning=ds.partitioning(partition_schema(), flavor="hive"),
+            basename_template=f"part-{run_id}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+        print(f"Wrote {table.num_rows} listings to {self.root}")
+        return table.num_rows
+
+    def dataset(self):
+        return ds.dataset(
+            self.root,
+            format="parquet",
+            partitioning=ds.partitioning(partition_schema(), flavor="hive"),
+        )
+
+    def read(
+        self,
+        start_date=None,
+        end_date=None,
+        sources=None,
+        neighborhoods=None,
+        columns=None,
+    ):
+        """Load listings as a DataFrame, reading only the partitions the filters allow
+
+        Dates are inclusive "YYYY-MM-DD" strings.
+        """
+        conditions = []
+        if start_date is not None:
+            conditions.append(pc.field("date") >= start_date)
+        if end_date is not None:
+            conditions.append(pc.field("date") <= end_date)
+        if sources is not None:
+            conditions.append(pc.field("source").isin(list(sources)))
+        if neighborhoods is not None:
+            conditions.append(pc.field("neighborhood").isin(list(neighborhoods)))
+
+        query = None
+        for condition in conditions:
+            query = condition if query is None else query & condition
+
+        try:
+            dataset = self.dataset()
+        except FileNotFoundError:
+            return pd.DataFrame(columns=PARTITION_FIELDS + listing_schema().names)
+
+        df = dataset.to_table(filter=query, columns=columns).to_pandas()
+        for field in ["source", "neighborhood"]:
+            if field in df:
+                df[field] = df[field].astype("category")
+        return df
@@ -1,24 +1,47 @@
-import time
-import random
 import re
-from bs4 import BeautifulSoup
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
-from scrapers.base_scraper import BaseScraper
+from scrapers.base_scraper import BaseScraper, class_strainer, compile_selectors
+from scrapers.listing import Listing
+
+
+# Reads the same fields as StreetEasyScraper.read_card in a single script call
+EXTRACT_SCRIPT = """
+const text = (root, selector) => {
+    const el = root.querySelector(selector);
+    return el ? el.textContent.trim() : null;
+};
+return Array.from(
+    document.querySelectorAll("div.searchCardList--listItem")
+).map(card => ({
+    price: text(card, "span.price"),
+    address: text(card, "address.listingCard-addressLabel"),
+    details: text(card, "div.listingCard-keyDetails"),
+}));
+"""
 
 
 class StreetEasyScraper(BaseScraper):
-    def __init__(self, headless=True):
-        super().__init__(headless)
+    card_selector = "div.searchCardList--listItem"
+    page_size = 14
+    extract_script = EXTRACT_SCRIPT
+    card_strainer = class_strainer("div", "searchCardList--listItem")
+
+    # Compiled once at class load and reused for every card
+    (property_selector,) = compile_selectors("div.searchCardList--listItem")
+    price_selectors = compile_selectors("span.price")
+    address_selectors = compile_selectors("address.listingCard-addressLabel")
+    details_selectors = compile_selectors("div.listingCard-keyDetails")
+
+    def __init__(self, headless=True, **kwargs):
+        super().__init__(headless, **kwargs)
         self.current_source = "streeteasy"
 
-    def scrape_neighborhood(self, neighborhood_name, property_type="rent", max_pages=3):
-        """Scrape StreetEasy listings for a specific neighborhood"""
+    def open_search(self, neighborhood_name, property_type):
+        """Load the first results page to scrape, returning (search_url, page) or None"""
         print(f"Scraping StreetEasy - {neighborhood_name}...")
-        self.current_neighborhood = neighborhood_name
-        self.current_property_type = property_type
 
         # StreetEasy has different URL structure
         neighborhood_formatted = neighborhood_name.replace("-", "_")
@@ -28,104 +51,82 @@ class StreetEasyScraper(BaseScraper):
         else:
             search_url = f"https://streeteasy.com/for-sale/{neighborhood_formatted}"
 
-        self.driver.get(search_url)
-        time.sleep(random.uniform(3, 5))
+        # Pick up after the last page a previous, interrupted run recorded
+        first_page = self.resume_page()
+        self.load_page(self.get_page_url(search_url, first_page))
 
         # Wait for page to load
-        try:
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located(
-                    (By.CSS_SELECTOR, "div.SearchResultsListingsContainer")
+        with self.timed("wait"):
+            try:
+                WebDriverWait(self.driver, 10).until(
+                    EC.presence_of_element_located(
+                        (By.CSS_SELECTOR, "div.SearchResultsListingsContainer")
+                    )
                 )
-            )
-        except:
-            print(f"Timeout or error loading {search_url}")
-            return []
-
-        self.scroll_page()
-
-        # Handle pagination and extract properties
-        all_properties = []
-        current_page = 1
+            except:
+                print(f"Timeout or error loading {search_url}")
+                return None
 
-        while current_page <= max_pages:
-            # Extract properties from current page
-            soup = BeautifulSoup(self.driver.page_source, "html.parser")
-            properties = self.extract_properties(soup)
-            all_properties.extend(properties)
+        return search_url, first_page
 
-            print(
-                f"StreetEasy - Page {current_page}: Extracted {len(properties)} properties"
-            )
-
-            # Check if there's a next page button
-            try:
-                next_button = self.driver.find_element(By.CSS_SELECTOR, "a.next_page")
-                if next_button:
-                    next_button.click()
-                    time.sleep(random.uniform(3, 5))
-                    self.scroll_page()
-                    current_page += 1
-                else:
-                    print("No more StreetEasy pages available")
-                    break
-            except Exception as e:
-                print(f"Error navigating to next StreetEasy page: {e}")
-                break
-
-        return all_properties
+    def get_page_url(self, search_url, page):
+        """Build the URL of results page N of a search"""
+        if page == 1:
+            return search_url
+        return f"{search_url}?page={page}"
 
     def extract_properties(self, soup):
         """Extract property data from StreetEasy's HTML"""
-        property_cards = soup.select("div.searchCardList--listItem")
+        property_cards = self.property_selector.select(soup)
 
-        properties = []
+        raw_cards = []
         for card in property_cards:
             try:
-                # Price
-                price_elem = card.select_one("span.price")
-                price = price_elem.text.strip() if price_elem else "N/A"
-
-                # Address
-                address_elem = card.select_one("address.listingCard-addressLabel")
-                address = address_elem.text.strip() if address_elem else "N/A"
-
-                # Details
-                details_elem = card.select_one("div.listingCard-keyDetails")
-                beds, baths, sqft = "N/A", "N/A", "N/A"
-
-                if details_elem:
-                    details_text = details_elem.text.strip()
-
-                    # Extract bedrooms
-                    bed_match = re.search(r"(\d+)\s*bed", details_text, re.IGNORECASE)
-                    if bed_match:
-                        beds = f"{bed_match.group(1)} bed"
-
-                    # Extract bathrooms
-                    bath_match = re.search(r"(\d+)\s*bath", details_text, re.IGNORECASE)
-                    if bath_match:
-                        baths = f"{bath_match.group(1)} bath"
-
-                    # Extract square footage
-                    sqft_match = re.search(r"(\d+,?\d*)\s*ft²", details_text)
-                    if sqft_match:
-                        sqft = f"{sqft_match.group(1)} sqft"
-
-                properties.append(
-                    {
-                        "source": "streeteasy",
-                        "neighborhood": self.current_neighborhood,
-                        "price": price,
-                        "address": address,
-                        "beds": beds,
-                        "baths": baths,
-                        "sqft": sqft,
-                        "property_type": self.current_property_type,
-                    }
-                )
+                raw_cards.append(self.read_card(card))
             except Exception as e:
                 print(f"Error extracting StreetEasy data from card: {e}")
                 continue
 
-        return properties
+        return self.build_properties(raw_cards)
+
+    def read_card(self, card):
+        """Read the raw text fields of one StreetEasy card (mirrors extract_script)"""
+        return {
+            "price": self.try_selectors(card, self.price_selectors),
+            "address": self.try_selectors(card, self.address_selectors),
+            "details": self.try_selectors(card, self.details_selectors),
+        }
+
+    def build_property(self, raw):
+        """Turn one raw StreetEasy card into a Listing"""
+        beds, baths, sqft = "N/A", "N/A", "N/A"
+
+        details_text = raw["details"]
+        if details_text is not None:
+            # Extract bedrooms; studios are listed as "Studio" with no count
+            bed_match = re.search(r"(\d+(?:\.\d+)?)\s*bed", details_text, re.IGNORECASE)
+            if bed_match:
+                beds = f"{bed_match.group(1)} bed"
+            elif re.search(r"\bstudio\b", details_text, re.IGNORECASE):
+                beds = "Studio"
+
+            # Extract bathrooms, which can be halves ("1.5 baths")
+            bath_match = re.search(r"(\d+(?:\.\d+)?)\s*bath", details_text, re.IGNORECASE)
+            if bath_match:
+                baths = f"{bath_match.group(1)} bath"
+
+            # Extract square footage
+            sqft_match = re.search(r"(\d+,?\d*)\s*ft²", details_text)
+            if sqft_match:
+                sqft = f"{sqft_match.group(1)} sqft"
+
+        return Listing.from_display(
+            "streeteasy",
+            self.current_neighborhood,
+            self.current_property_type,
+            price=raw["price"],
+            address=raw["address"],
+            beds=beds,
+            baths=baths,
+            sqft=sqft,
+        )
@@ -0,0 +1,142 @@
+import os
+import json
+import math
+import time
+import threading
+import contextlib
+
+# Quantiles exported per phase and source
+QUANTILES = (0.5, 0.95)
+
+
+def quantile(sorted_values, q):
+    """Nearest-rank quantile of an already sorted list"""
+    index = max(math.ceil(q * len(sorted_values)) - 1, 0)
+    return sorted_values[index]
+
+
+class PhaseTimer:
+    """Per-page timings of each scrape phase (get, wait, scroll, page_source, parse, extract)
+
+    Every record is tagged with source, neighborhood and page, and may carry
+    the bytes transferred or cards found. save() writes the run's records and
+    summary as JSON, plus a Prometheus textfile with p50/p95 per phase and source.
+    """
+
+    def __init__(self, report_path=None, prometheus_path=None):
+        self.report_path = report_path
+        self.prometheus_path = prometheus_path
+        self.records = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_run(cls, property_type="rent", directory="runs"):
+        """Timer writing to today's report and a textfile the node exporter can pick up"""
+        filename = f"timing_{property_type}_{time.strftime('%Y%m%d')}.json"
+        return cls(
+            report_path=os.path.join(directory, filename),
+            prometheus_path=os.path.join(directory, "scraper_timing.prom"),
+        )
+
+    @contextlib.contextmanager
+    def phase(self, phase, source, neighborhood=None, page=None):
+        """Time the enclosed block; the yielded record can be given bytes/cards"""
+        record = {
+            "source": source,
+            "neighborhood": neighborhood,
+            "page": page,
+            "phase": phase,
+        }
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = time.perf_counter() - start
+            with self._lock:
+                self.records.append(record)
+
+    def summary(self):
+        """Count, total, p50 and p95 seconds, bytes and cards per (source, phase)"""
+        with self._lock:
+            records = list(self.records)
+
+        groups = {}
+        for record in records:
+            groups.setdefault((record["source"], record["phase"]), []).append(record)
+
+        rows = []
+        for (source, phase), group in sorted(groups.items()):
+            seconds = sorted(record["seconds"] for record in group)
+            row = {
+                "source": source,
+                "phase": phase,
+                "count": len(seconds),
+                "seconds_total": sum(seconds),
+                "bytes_total": sum(record.get("bytes", 0) for record in group),
+                "cards_total": sum(record.get("cards", 0) for record in group),
+            }
+            for q in QUANTILES:
+                row[f"p{int(q * 100)}"] = quantile(seconds, q)
+            rows.append(row)
+        return rows
+
+    def write_report(self, path):
+        with self._lock:
+            records = list(self.records)
+        report = {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "summary": self.summary(),
+            "records": records,
+        }
+        write_atomic(path, json.dumps(report, indent=2))
+
+    def write_prometheus(self, path):
+        lines = [
+            "# HELP scraper_phase_seconds Time spent in each scrape phase per page",
+            "# TYPE scraper_phase_seconds summary",
+        ]
+        totals = []
+        for row in self.summary():
+            labels = f'source="{row["source"]}",phase="{row["phase"]}"'
+            for q in QUANTILES:
+                lines.append(
+                    f'scraper_phase_seconds{{{labels},quantile="{q}"}} '
+                    f'{row[f"p{int(q * 100)}"]:.6f}'
+                )
+            lines.append(f"scraper_phase_seconds_sum{{{labels}}} {row['seconds_total']:.6f}")
+            lines.append(f"scraper_phase_seconds_count{{{labels}}} {row['count']}")
+            totals.append((labels, row))
+
+        lines.append("# HELP scraper_phase_bytes_total Bytes of page HTML transferred per phase")
+        lines.append("# TYPE scraper_phase_bytes_total counter")
+        lines.extend(
+            f"scraper_phase_bytes_total{{{labels}}} {row['bytes_total']}"
+            for labels, row in totals
+            if row["bytes_total"]
+        )
+        lines.append("# HELP scraper_phase_cards_total Listing cards handled per phase")
+        lines.append("# TYPE scraper_phase_cards_total counter")
+        lines.extend(
+            f"scraper_phase_cards_total{{{labels}}} {row['cards_total']}"
+            for labels, row in totals
+            if row["cards_total"]
+        )
+        write_atomic(path, "\n".join(lines) + "\n")
+
+    def save(self):
+        """Write the JSON report and Prometheus textfile to their configured paths"""
+        if self.report_path:
+            self.write_report(self.report_path)
+            print(f"Saved timing report to {self.report_path}")
+        if self.prometheus_path:
+            self.write_prometheus(self.prometheus_path)
+
+
+def write_atomic(path, text):
+    """Write a file via a temporary name, so collectors never read half of it"""
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
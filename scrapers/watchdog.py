@@ -0,0 +1,140 @@
+import os
+import json
+import time
+import signal
+import threading
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from urllib3.exceptions import HTTPError
+
+from scrapers.memory import driver_pid, process_tree_pids
+
+# Failures a unit is retried on, on a fresh browser: page loads or scripts
+# running past their timeout, and calls on a browser the watchdog killed.
+# Selenium doesn't wrap the errors of a dead chromedriver, so those come
+# through as urllib3's MaxRetryError/ProtocolError or a refused connection.
+RETRYABLE_ERRORS = (TimeoutException, WebDriverException, HTTPError, ConnectionError)
+
+# Windows has no SIGKILL; os.kill with SIGTERM terminates the process there
+KILL_SIGNAL = getattr(signal, "SIGKILL", signal.SIGTERM)
+
+
+class Watchdog:
+    """Hard timeouts for scrapers, so one stuck page can't stall a sweep
+
+    Browsers get page-load and script timeouts, and each unit (one
+    neighborhood) a deadline. A unit past its deadline has its browser's
+    process tree killed, which makes any call blocked on it fail at once.
+    The scraper then moves to a fresh browser and retries the unit, or skips
+    it once retries run out. Every retry and skip is kept in `events` with
+    its reason and, with a log_path, appended to a JSONL file.
+    """
+
+    def __init__(
+        self,
+        page_load_timeout=30,
+        script_timeout=30,
+        unit_deadline=300,
+        retries=1,
+        log_path=None,
+    ):
+        self.page_load_timeout = page_load_timeout
+        self.script_timeout = script_timeout
+        # Seconds of scraping a unit may take, not counting time its pages
+        # spend with downstream consumers
+        self.unit_deadline = unit_deadline
+        self.retries = retries
+        self.log_path = log_path
+        self.events = []
+        self._timers = {}
+        self._expired = set()
+        self._lock = threading.Lock()
+
+    def configure(self, driver):
+        """Apply the page-load and script timeouts to a browser"""
+        driver.set_page_load_timeout(self.page_load_timeout)
+        driver.set_script_timeout(self.script_timeout)
+
+    def arm(self, scraper, seconds):
+        """Kill the scraper's browser if it is still working in `seconds`"""
+        timer = threading.Timer(max(seconds, 0), self._expire, args=(scraper,))
+        timer.daemon = True
+        with self._lock:
+            self._timers[id(scraper)] = timer
+        timer.start()
+
+    def disarm(self, scraper):
+        with self._lock:
+            timer = self._timers.pop(id(scraper), None)
+        if timer is not None:
+            timer.cancel()
+
+    def expired(self, scraper):
+        """Whether the deadline killed the scraper's browser; clears the flag"""
+        with self._lock:
+            if id(scraper) in self._expired:
+                self._expired.discard(id(scraper))
+                return True
+            return False
+
+    def _expire(self, scraper):
+        with self._lock:
+            self._timers.pop(id(scraper), None)
+            self._expired.add(id(scraper))
+        print(
+            f"{scraper.current_source} - {scraper.current_neighborhood}: "
+            f"over the {self.unit_deadline}s deadline, killing browser"
+        )
+        kill_driver(scraper.driver)
+
+    def watch(self, scraper, batches):
+        """Yield from a unit's batch generator under the unit deadline
+
+        The clock stops while each batch is with the consumer, so slow sinks
+        don't count against the browser.
+        """
+        budget = self.unit_deadline
+        batches = iter(batches)
+        while True:
+            started = time.monotonic()
+            self.arm(scraper, budget)
+            try:
+                batch = next(batches)
+            except StopIteration:
+                return
+            finally:
+                self.disarm(scraper)
+                budget -= time.monotonic() - started
+            yield batch
+
+    def record(self, scraper, attempt, reason, action):
+        """Log a retried or skipped unit"""
+        event = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "source": scraper.current_source,
+            "neighborhood": scraper.current_neighborhood,
+            "property_type": scraper.current_property_type,
+            "page": scraper.current_page,
+            "attempt": attempt,
+            "reason": reason,
+            "action": action,
+        }
+        print(
+            f"{scraper.current_source} - {scraper.current_neighborhood}: "
+            f"{reason}, {action}"
+        )
+        with self._lock:
+            self.events.append(event)
+            if self.log_path:
+                with open(self.log_path, "a") as f:
+                    f.write(json.dumps(event) + "\n")
+
+
+def kill_driver(driver):
+    """Kill chromedriver and every browser process under it"""
+    # Children first, so none of them gets re-parented and left running
+    for pid in reversed(process_tree_pids(driver_pid(driver))):
+        try:
+            os.kill(pid, KILL_SIGNAL)
+        except OSError:
+            pass
@@ -1,16 +1,78 @@
-import time
-import random
-from bs4 import BeautifulSoup
+import re
+import json
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
-from scrapers.base_scraper import BaseScraper
+from scrapers.base_scraper import BaseScraper, class_strainer, compile_selectors
+from scrapers.listing import Listing, parse_beds, parse_number
+
+
+# Reads the same fields as ZillowScraper.read_card in a single script call
+EXTRACT_SCRIPT = """
+const text = (root, selector) => {
+    const el = root.querySelector(selector);
+    return el ? el.textContent.trim() : null;
+};
+return Array.from(document.querySelectorAll("div.property-card-data")).map(card => {
+    const details = card.querySelector(
+        "ul.StyledPropertyCardHomeDetailsList-c11n-8-109-3__sc-1j0som5-0"
+    );
+    return {
+        price: text(card, "span[data-test='property-card-price']"),
+        address: text(card, "address"),
+        details: details
+            ? Array.from(details.querySelectorAll("li")).map(
+                  item => [item.textContent.trim(), text(item, "b")]
+              )
+            : null,
+    };
+});
+"""
+
+# Returns the page's embedded search-results state without the rest of the HTML
+STATE_SCRIPT = """
+const next = document.getElementById("__NEXT_DATA__");
+if (next) return next.textContent;
+const legacy = document.querySelector(
+    "script[data-zrr-shared-data-key='mobileSearchPageStore']"
+);
+return legacy ? legacy.textContent : null;
+"""
+
+# Same lookup as STATE_SCRIPT, for HTML that is already on hand
+STATE_PATTERNS = [
+    re.compile(r'<script[^>]*id="__NEXT_DATA__"[^>]*>(.*?)</script>', re.S),
+    re.compile(
+        r'<script[^>]*data-zrr-shared-data-key="mobileSearchPageStore"[^>]*>(.*?)</script>',
+        re.S,
+    ),
+]
 
 
 class ZillowScraper(BaseScraper):
-    def __init__(self, headless=True):
-        super().__init__(headless)
+    card_selector = "div.property-card-data"
+    page_size = 41
+    extract_script = EXTRACT_SCRIPT
+    card_strainer = class_strainer("div", "property-card-data")
+
+    # Compiled once at class load and reused for every card
+    property_selectors = compile_selectors("div.property-card-data")
+    price_selectors = compile_selectors("span[data-test='property-card-price']")
+    address_selectors = compile_selectors(
+        "address"
+        # "address.list-card-addr",
+        # "address[data-test='property-card-addr']",
+        # "a.property-card-link address",
+    )
+    details_selector, detail_item_selector, bold_selector = compile_selectors(
+        "ul.StyledPropertyCardHomeDetailsList-c11n-8-109-3__sc-1j0som5-0",
+        "li",
+        "b",
+    )
+
+    def __init__(self, headless=True, **kwargs):
+        super().__init__(headless, **kwargs)
         self.current_source = "zillow"
         self.base_url = "https://www.zillow.com"
 
@@ -24,10 +86,8 @@ class ZillowScraper(BaseScraper):
         )
         return neighborhood_url
 
-    def scrape_neighborhood(self, neighborhood_name, property_type="rent", max_pages=3):
-        """Scrape Zillow listings for a specific neighborhood"""
-        self.current_neighborhood = neighborhood_name
-        self.current_property_type = property_type
+    def open_search(self, neighborhood_name, property_type):
+        """Load the first results page to scrape, returning (search_url, page) or None"""
         neighborhood_url = self.get_neighborhood_url(neighborhood_name)
 
         # Construct search URL
@@ -38,91 +98,54 @@ class ZillowScraper(BaseScraper):
 
         print(f"searching url: {search_url}")
 
-        self.driver.get(search_url)
-        time.sleep(random.uniform(3, 5))
+        # Pick up after the last page a previous, interrupted run recorded
+        first_page = self.resume_page()
+        self.load_page(self.get_page_url(search_url, first_page))
 
         # Check if access has been denied
         page_title = self.driver.title
         if "Access to this page has been denied" in page_title:
             print(f"Access denied error when loading {search_url}")
-            return []
+            return None
 
         # Wait for page to load
-        try:
-            selectors = [
-                "ul.photo-cards",
-                "div.search-page-lst-container",
-                # "div[data-testid='search-list']",
-            ]
-            for selector in selectors:
-                try:
-                    WebDriverWait(self.driver, 5).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-                    )
-                    break
-                except:
-                    continue
-        except:
-            print(f"Timeout or error loading {search_url}")
-            return []
-
-        self.scroll_page()
-        # Handle pagination and extract properties
-        all_properties = []
-        current_page = 1
-
-        while current_page <= max_pages:
-            print(f"Zillow - Extracting page {current_page}")
-
-            # Extract properties from current page
-            soup = BeautifulSoup(self.driver.page_source, "html.parser")
-            properties = self.extract_properties(soup)
-            all_properties.extend(properties)
-
-            print(
-                f"Zillow - Page {current_page}: Extracted {len(properties)} properties"
-            )
-
-            # Check if there's a next page button
+        with self.timed("wait"):
             try:
-                pagination_selector = "a[rel='next'][title='Next page']"
-
-                next_page_found = False
-                next_page_elements = self.driver.find_elements(
-                    By.CSS_SELECTOR, pagination_selector
-                )
-                if next_page_elements and len(next_page_elements) > 0:
-                    # Check if the next button is disabled
-                    if "disabled" not in next_page_elements[0].get_attribute(
-                        "aria-disabled"
-                    ).lower() and "true" != next_page_elements[0].get_attribute(
-                        "aria-disabled"
-                    ):
-                        next_page_elements[0].click()
-                        next_page_found = True
+                selectors = [
+                    "ul.photo-cards",
+                    "div.search-page-lst-container",
+                    # "div[data-testid='search-list']",
+                ]
+                for selector in selectors:
+                    try:
+                        WebDriverWait(self.driver, 5).until(
+                            EC.presence_of_element_located((By.CSS_SELECTOR, selector))
+                        )
                         break
+                    except:
+                        continue
+            except:
+                print(f"Timeout or error loading {search_url}")
+                return None
 
-                if not next_page_found:
-                    print("No more Zillow pages available")
-                    break
+        return search_url, first_page
 
-                time.sleep(random.uniform(3, 5))
-                self.scroll_page()
-                current_page += 1
-
-            except Exception as e:
-                print(f"Error navigating to next Zillow page: {e}")
-                break
+    def needs_scroll(self):
+        """Whether cards must be scrolled into view before extraction"""
+        # The embedded search state already holds every listing on the page
+        return self.extraction_engine != "state"
 
-        return all_properties
+    def get_page_url(self, search_url, page):
+        """Build the URL of results page N of a search"""
+        if page == 1:
+            return search_url
+        return f"{search_url.rstrip('/')}/{page}_p/"
 
     def extract_properties(self, soup):
         """Extract property data from Zillow's HTML"""
-        property_selectors = ["div.property-card-data"]
-
         property_cards = []
-        for selector in property_selectors:
-            cards = soup.select(selector)
+        for selector in self.property_selectors:
+            cards = selector.select(soup)
             if cards:
                 property_cards = cards
                 break
@@ -130,80 +153,180 @@ class ZillowScraper(BaseScraper):
         if not property_cards:
             print("No Zillow property cards found with known selectors")
 
-        properties = []
+        raw_cards = []
         for i, card in enumerate(property_cards):
             print(f"Processing Zillow property card {i+1}/{len(property_cards)}")
             try:
-                # For price
-                price_selectors = [
-                    "span[data-test='property-card-price']",
-                ]
-                price = self.try_selectors(card, price_selectors)
-
-                # For address
-                address_selectors = [
-                    "address"
-                    # "address.list-card-addr",
-                    # "address[data-test='property-card-addr']",
-                    # "a.property-card-link address",
-                ]
-                address = self.try_selectors(card, address_selectors)
+                raw_cards.append(self.read_card(card))
+            except Exception as e:
+                print(f"Error extracting Zillow data from card: {e}")
+                continue
 
-                # For details (beds, baths, sqft)
-                beds, baths, sqft = "N/A", "N/A", "N/A"
+        return self.build_properties(raw_cards)
 
-                details_selector = (
-                    "ul.StyledPropertyCardHomeDetailsList-c11n-8-109-3__sc-1j0som5-0"
+    def read_card(self, card):
+        """Read the raw text fields of one Zillow card (mirrors extract_script)"""
+        # For price
+        price = self.try_selectors(card, self.price_selectors)
+
+        # For address
+        address = self.try_selectors(card, self.address_selectors)
+
+        # For details (beds, baths, sqft), keep each list item's text and bold text
+        details = None
+        details_element = self.details_selector.select_one(card)
+
+        if details_element:
+            details = []
+            for item in self.detail_item_selector.select(details_element):
+                bold = self.bold_selector.select_one(item)
+                details.append(
+                    [item.text.strip(), bold.text.strip() if bold else None]
                 )
-                details_element = card.select_one(details_selector)
-
-                if details_element:
-                    # Process list items within the ul
-                    list_items = details_element.select("li")
-                    for item in list_items:
-                        item_text = item.text.strip()
-
-                        # Check for Studio
-                        if "Studio" in item_text:
-                            beds = "Studio"
-                        # Check for bedroom info (usually has b tag)
-                        elif (
-                            item.select_one("b")
-                            and "ba" not in item_text.lower()
-                            and "sqft" not in item_text.lower()
-                        ):
-                            beds = item.select_one("b").text.strip() + " bed"
-                        # Check for bathroom info
-                        elif "ba" in item_text.lower():
-                            baths = (
-                                item.select_one("b").text.strip() + " ba"
-                                if item.select_one("b")
-                                else item_text
-                            )
-                        # Check for square footage
-                        elif "sqft" in item_text.lower():
-                            sqft = (
-                                item.select_one("b").text.strip() + " sqft"
-                                if item.select_one("b")
-                                else item_text
-                            )
-
-                # Only add if we found at least price or address
-                if price or address:
-                    properties.append(
-                        {
-                            "source": "zillow",
-                            "neighborhood": self.current_neighborhood,
-                            "price": price or "N/A",
-                            "address": address or "N/A",
-                            "beds": beds,
-                            "baths": baths,
-                            "sqft": sqft,
-                            "property_type": self.current_property_type,
-                        }
-                    )
+
+        return {"price": price, "address": address, "details": details}
+
+    def build_property(self, raw):
+        """Turn one raw Zillow card into a Listing"""
+        price = raw["price"]
+        address = raw["address"]
+        beds, baths, sqft = "N/A", "N/A", "N/A"
+
+        for item_text, bold_text in raw["details"] or []:
+            # Check for Studio
+            if "Studio" in item_text:
+                beds = "Studio"
+            # Check for bedroom info (usually has b tag)
+            elif (
+                bold_text is not None
+                and "ba" not in item_text.lower()
+                and "sqft" not in item_text.lower()
+            ):
+                beds = bold_text + " bed"
+            # Check for bathroom info
+            elif "ba" in item_text.lower():
+                baths = bold_text + " ba" if bold_text is not None else item_text
+            # Check for square footage
+            elif "sqft" in item_text.lower():
+                sqft = bold_text + " sqft" if bold_text is not None else item_text
+
+        # Only add if we found at least price or address
+        if not (price or address):
+            return None
+
+        return Listing.from_display(
+            "zillow",
+            self.current_neighborhood,
+            self.current_property_type,
+            price=price,
+            address=address,
+            beds=beds,
+            baths=baths,
+            sqft=sqft,
+        )
+
+    def extract_current_page(self):
+        """Extract properties from the loaded page, preferring the embedded state"""
+        if self.extraction_engine == "state":
+            html = self.cache_current_page()
+            if html is not None:
+                state_text = self.find_search_state(html)
+            else:
+                with self.timed("page_source") as timing:
+                    state_text = self.driver.execute_script(STATE_SCRIPT)
+                    timing["bytes"] = len((state_text or "").encode("utf-8"))
+
+            with self.timed("extract") as timing:
+                properties = self.parse_search_state(state_text)
+                timing["cards"] = len(properties or [])
+            if properties is not None:
+                return properties
+
+            print("No Zillow search state found, falling back to property cards")
+            with self.timed("scroll"):
+                self.scroll_page()
+            return self.extract_properties_from_html(self.read_page_source())
+
+        return super().extract_current_page()
+
+    def extract_properties_from_html(self, html):
+        """Extract properties from a page's HTML, e.g. an archived page"""
+        if self.extraction_engine == "state":
+            properties = self.parse_search_state(self.find_search_state(html))
+            if properties is not None:
+                return properties
+
+        return super().extract_properties_from_html(html)
+
+    def find_search_state(self, html):
+        """Return the text of the search-state script embedded in page HTML, if any"""
+        for pattern in STATE_PATTERNS:
+            match = pattern.search(html)
+            if match:
+                return match.group(1)
+        return None
+
+    def parse_search_state(self, state_text):
+        """Decode Zillow's embedded search state, or return None if it has no results"""
+        if not state_text:
+            return None
+
+        # The legacy store is wrapped in an HTML comment
+        state_text = state_text.strip()
+        if state_text.startswith("<!--"):
+            state_text = state_text[4:-3]
+
+        try:
+            state = json.loads(state_text)
+        except ValueError as e:
+            print(f"Error decoding Zillow search state: {e}")
+            return None
+
+        page_state = (
+            state.get("props", {}).get("pageProps", {}).get("searchPageState", state)
+        )
+        results = page_state.get("cat1", {}).get("searchResults", {}).get("listResults")
+        if results is None:
+            return None
+
+        properties = []
+        for item in results:
+            try:
+                properties.append(self.build_state_property(item))
             except Exception as e:
-                print(f"Error extracting Zillow data from card: {e}")
+                print(f"Error extracting Zillow data from search state: {e}")
                 continue
 
         return properties
+
+    def build_state_property(self, item):
+        """Turn one search-state listing into a Listing"""
+        # Either level can be present but null in the blob
+        home_info = (item.get("hdpData") or {}).get("homeInfo") or {}
+        # Buildings list their available units instead of a single price
+        unit = (item.get("units") or [{}])[0] or {}
+        lat_long = item.get("latLong") or {}
+
+        price = item.get("unformattedPrice") or parse_number(
+            item.get("price") or unit.get("price")
+        )
+        beds = item.get("beds", home_info.get("bedrooms", unit.get("beds")))
+        baths = item.get("baths", home_info.get("bathrooms"))
+        sqft = item.get("area", home_info.get("livingArea"))
+
+        return Listing(
+            "zillow",
+            self.current_neighborhood,
+            self.current_property_type,
+            address=item.get("address"),
+            price=price,
+            beds=parse_beds(beds),
+            baths=parse_number(baths) or None,
+            sqft=parse_number(sqft) or None,
+            extra={
+                "zpid": item.get("zpid") or home_info.get("zpid"),
+                "listing_id": item.get("id"),
+                "latitude": lat_long.get("latitude", home_info.get("latitude")),
+                "longitude": lat_long.get("longitude", home_info.get("longitude")),
+            },
+        )